@@ -1,3 +1,4 @@
+import heapq
 import itertools
 
 
@@ -261,3 +262,404 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+class CNF():
+    """Conjunctive normal form of sentences, as clauses of integer literals.
+
+    Each symbol is numbered from 1, and its negation is the negative
+    number. Every compound sentence gets a variable of its own, defined to
+    be equivalent to it (the Tseitin transformation), so the clauses grow
+    linearly with the sentences instead of exponentially.
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+        self.symbols = {}
+
+        # Literals of the compound sentences already encoded, by id, with
+        # the sentence itself so that the id is not reused
+        self.encoded = {}
+
+    def variable(self):
+        """Returns a new variable."""
+        self.variables += 1
+        return self.variables
+
+    def add(self, sentence):
+        """Adds clauses that are satisfiable exactly when sentence is."""
+        stack = [sentence]
+        while stack:
+            sentence = stack.pop()
+            if isinstance(sentence, And):
+                stack.extend(sentence.conjuncts)
+            elif isinstance(sentence, Or) and all(
+                CNF.is_literal(disjunct) for disjunct in sentence.disjuncts
+            ):
+                self.clauses.append(
+                    [self.literal(disjunct) for disjunct in sentence.disjuncts]
+                )
+            else:
+                self.clauses.append([self.literal(sentence)])
+
+    @classmethod
+    def is_literal(cls, sentence):
+        """Checks if a sentence is a symbol or a negated symbol."""
+        if isinstance(sentence, Not):
+            sentence = sentence.operand
+        return isinstance(sentence, Symbol)
+
+    def literal(self, sentence):
+        """Returns the literal equivalent to sentence, encoding it if needed."""
+
+        # Encode children before their parents, without recursion, so that
+        # deeply nested sentences do not overflow the stack
+        stack = [(sentence, False)]
+        while stack:
+            current, ready = stack.pop()
+            if self.known(current) is not None:
+                continue
+            children = self.children(current)
+            if ready:
+                self.define(current, [self.known(child) for child in children])
+            else:
+                stack.append((current, True))
+                stack.extend((child, False) for child in children)
+        return self.known(sentence)
+
+    def known(self, sentence):
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.variable()
+            return self.symbols[sentence.name]
+        if id(sentence) in self.encoded:
+            return self.encoded[id(sentence)][1]
+        return None
+
+    @classmethod
+    def children(cls, sentence):
+        if isinstance(sentence, Not):
+            return [sentence.operand]
+        if isinstance(sentence, And):
+            return sentence.conjuncts
+        if isinstance(sentence, Or):
+            return sentence.disjuncts
+        if isinstance(sentence, Implication):
+            return [sentence.antecedent, sentence.consequent]
+        if isinstance(sentence, Biconditional):
+            return [sentence.left, sentence.right]
+        if isinstance(sentence, Symbol):
+            return []
+        raise TypeError(f"cannot convert {sentence!r} to CNF")
+
+    def define(self, sentence, literals):
+        """Adds a literal equivalent to sentence, given its children's."""
+        if isinstance(sentence, Not):
+            literal = -literals[0]
+        elif isinstance(sentence, Implication):
+            literal = self.gate([-literals[0], literals[1]], disjunction=True)
+        elif isinstance(sentence, Biconditional):
+            literal = self.variable()
+            left, right = literals
+            self.clauses.extend([
+                [-literal, -left, right],
+                [-literal, left, -right],
+                [literal, left, right],
+                [literal, -left, -right]
+            ])
+        else:
+            literal = self.gate(literals, disjunction=isinstance(sentence, Or))
+        self.encoded[id(sentence)] = (sentence, literal)
+
+    def gate(self, literals, disjunction):
+        """Returns a new variable equivalent to the And or Or of literals."""
+        if len(literals) == 1:
+            return literals[0]
+
+        # An Or is the negation of the And of the negated literals
+        sign = -1 if disjunction else 1
+        literal = self.variable()
+        for operand in literals:
+            self.clauses.append([-literal, sign * operand])
+        self.clauses.append([literal] + [-sign * operand for operand in literals])
+        return sign * literal
+
+
+class Solver():
+    """Conflict-driven clause learning SAT solver.
+
+    Clauses are lists of integer literals, as made by CNF. Assignments are
+    propagated through two watched literals per clause; every conflict is
+    analysed back to its first unique implication point, learned as a new
+    clause with any literals its others imply left out, and the search
+    jumps back to the level where that clause becomes unit. Decisions
+    follow the variables most involved in recent conflicts, the search
+    restarts now and then, and whenever it has learned too many clauses
+    it forgets the longer half.
+    """
+
+    # Conflicts before the first restart, and the growth of that limit
+    RESTART = 100
+    RESTART_GROWTH = 1.5
+
+    # Factor the activity of variables decays by at each conflict
+    DECAY = 0.95
+
+    # Learned clauses kept before forgetting some, and the growth of that
+    # limit
+    LEARNED = 2000
+    LEARNED_GROWTH = 1.1
+
+    def __init__(self, variables, clauses):
+        self.variables = variables
+        self.values = [None] * (variables + 1)
+        self.truth = {}
+        self.levels = [0] * (variables + 1)
+        self.reasons = [None] * (variables + 1)
+        self.phases = [False] * (variables + 1)
+        self.activity = [0.0] * (variables + 1)
+        self.bump = 1.0
+        self.order = [(0.0, variable) for variable in range(1, variables + 1)]
+        self.watches = {}
+        self.learned = []
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.conflicts = 0
+        self.consistent = True
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def value(self, literal):
+        """Returns whether literal is true, or None if it is unassigned."""
+        return self.truth.get(literal)
+
+    def add_clause(self, clause):
+        """Adds a clause, before the search or between searches."""
+        self.backtrack(0)
+        clause = set(clause)
+        if any(-literal in clause for literal in clause):
+            return
+        if any(self.value(literal) for literal in clause):
+            return
+        clause = [literal for literal in clause
+                  if self.value(literal) is not False]
+        if not clause:
+            self.consistent = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.consistent = False
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.truth[literal] = True
+        self.truth[-literal] = False
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Makes every implied assignment. Returns a conflicting clause if
+        one becomes false, None otherwise."""
+        truth = self.truth
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = watches.get(false, [])
+            kept = []
+            for i, clause in enumerate(watching):
+
+                # Keep the literal that just became false second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                other = clause[0]
+                if truth.get(other):
+                    kept.append(clause)
+                    continue
+
+                # Watch another literal that is not false, if there is one
+                for k in range(2, len(clause)):
+                    if truth.get(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if truth.get(other) is False:
+                        kept.extend(watching[i + 1:])
+                        watches[false] = kept
+                        return clause
+                    self.assign(other, clause)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """Returns the clause learned from a conflict, asserting literal
+        first, and the level to jump back to."""
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump_activity(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Resolve on the latest assignment involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            seen.discard(abs(literal))
+            pending -= 1
+            if not pending:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+
+        # Leave out literals implied by the others: those whose reason is
+        # made of literals already in the clause, or fixed at level 0
+        learned = [learned[0]] + [
+            other for other in learned[1:]
+            if self.reasons[abs(other)] is None
+            or any(abs(reason) not in seen and self.levels[abs(reason)] > 0
+                   for reason in self.reasons[abs(other)][1:])
+        ]
+
+        if len(learned) == 1:
+            return learned, 0
+        second = max(range(1, len(learned)),
+                     key=lambda k: self.levels[abs(learned[k])])
+        learned[1], learned[second] = learned[second], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump_activity(self, variable):
+        self.activity[variable] += self.bump
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.bump *= 1e-100
+            self.order = [(-self.activity[variable], variable)
+                          for variable in range(1, self.variables + 1)
+                          if self.values[variable] is None]
+            heapq.heapify(self.order)
+        elif self.values[variable] is None:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        """Undoes every assignment made after the given decision level."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = None
+            self.reasons[variable] = None
+            del self.truth[literal], self.truth[-literal]
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = min(self.head, len(self.trail))
+
+    def forget(self):
+        """Drops the longer half of the learned clauses, but for those that
+        are the reasons for current assignments."""
+        locked = {id(self.reasons[abs(literal)]) for literal in self.trail}
+        self.learned.sort(key=len)
+        half = len(self.learned) // 2
+        forgotten = {id(clause) for clause in self.learned[half:]
+                     if id(clause) not in locked}
+        self.learned = self.learned[:half] + [
+            clause for clause in self.learned[half:]
+            if id(clause) in locked
+        ]
+        for literal, watching in self.watches.items():
+            self.watches[literal] = [clause for clause in watching
+                                     if id(clause) not in forgotten]
+
+    def decide(self):
+        """Returns the unassigned variable to branch on, or None if every
+        variable is assigned."""
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if self.values[variable] is None:
+                return variable
+        return None
+
+    def solve(self):
+        """Returns True if the clauses are satisfiable, False otherwise."""
+        if not self.consistent:
+            return False
+        restart = self.RESTART
+        conflicts = 0
+        limit = self.LEARNED
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    self.consistent = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watch(learned)
+                    self.learned.append(learned)
+                    self.assign(learned[0], learned)
+                self.bump /= self.DECAY
+                self.conflicts += 1
+                conflicts += 1
+                if len(self.learned) > limit:
+                    limit *= self.LEARNED_GROWTH
+                    self.forget()
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart *= self.RESTART_GROWTH
+                    self.backtrack(0)
+            else:
+                variable = self.decide()
+                if variable is None:
+                    return True
+                self.limits.append(len(self.trail))
+                self.assign(variable if self.phases[variable] else -variable,
+                            None)
+
+    def model(self):
+        """Returns the value of every variable after a satisfiable solve."""
+        return {variable: self.values[variable]
+                for variable in range(1, self.variables + 1)}
+
+
+def satisfiable(sentence):
+    """Checks if some model makes the sentence true."""
+    cnf = CNF()
+    cnf.add(sentence)
+    return Solver(cnf.variables, cnf.clauses).solve()
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query, by checking that the
+    knowledge base and the negation of the query can't both be true."""
+    return not satisfiable(And(knowledge, Not(query)))
@@ -190,7 +190,7 @@ class MinesweeperAI():
         for sentence in self.knowledge:
             sentence.mark_safe(cell)
 
-    def add_knowledge(self, cell, count):
+    def add_knowledge(self, cell, count, cancel=None):
         """
         Called when the Minesweeper board tells us, for a given
         safe cell, how many neighboring cells have mines in them.
@@ -204,6 +204,9 @@ class MinesweeperAI():
                if it can be concluded based on the AI's knowledge base
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
+
+        If `cancel` (anything with an is_set method) is set, it stops
+        inferring as soon as it can, with the knowledge part way updated.
         """
         
         #1) mark the cell as a move that has been made
@@ -236,6 +239,8 @@ class MinesweeperAI():
         
         noMoreChanges = False
         while (noMoreChanges == False):
+            if cancel is not None and cancel.is_set():
+                return
             noMoreChanges = True
             # 4) mark any additional cells as safe or as mines
             #    if it can be concluded based on the AI's knowledge base
@@ -267,6 +272,8 @@ class MinesweeperAI():
         while (noMoreChanges == False):
             noMoreChanges = True
             for subset in self.knowledge:
+                if cancel is not None and cancel.is_set():
+                    return
                 # Looping through sentences - looking for possible subset
                 for sentence in self.knowledge:
                     # Avoiding checking subset of itself
@@ -1,9 +1,67 @@
+import copy
 import pygame
+import queue
 import sys
+import threading
 import time
 
 from minesweeper import Minesweeper, MinesweeperAI
 
+
+class AIWorker():
+    """
+    Runs the AI on a background thread, so the window keeps drawing while
+    it thinks. Results come back through a queue. The function run is
+    passed a `cancel` event, set when the work is cancelled so that it can
+    stop early; whatever it returns then is thrown away.
+    """
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self.job = 0
+        self.busy = False
+        self.cancelled = threading.Event()
+
+    def start(self, function, *args):
+        self.job += 1
+        self.busy = True
+        job = self.job
+        self.cancelled = cancel = threading.Event()
+        threading.Thread(
+            target=lambda: self.results.put(
+                (job, function(*args, cancel=cancel))
+            ),
+            daemon=True
+        ).start()
+
+    def cancel(self):
+        self.job += 1
+        self.busy = False
+        self.cancelled.set()
+
+    def result(self):
+        """
+        Returns (True, result) once the current job is done, otherwise
+        (False, None).
+        """
+        while not self.results.empty():
+            job, value = self.results.get()
+            if job == self.job:
+                self.busy = False
+                return True, value
+        return False, None
+
+
+def learn(ai, cell, count, cancel=None):
+    """
+    Adds what was revealed at a cell to a copy of the AI's knowledge, and
+    returns the copy.
+    """
+    ai = copy.deepcopy(ai)
+    ai.add_knowledge(cell, count, cancel)
+    return ai
+
+
 HEIGHT = 8
 WIDTH = 8
 MINES = 8
@@ -17,6 +75,8 @@ WHITE = (255, 255, 255)
 pygame.init()
 size = width, height = 600, 400
 screen = pygame.display.set_mode(size)
+FPS = 30
+clock = pygame.time.Clock()
 
 # Fonts
 OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
@@ -46,6 +106,11 @@ revealed = set()
 flags = set()
 lost = False
 
+# The AI learns from each revealed cell in the background; until it has,
+# no other move can be made
+worker = AIWorker()
+learning = None
+
 # Show instructions initially
 instructions = True
 
@@ -96,6 +161,7 @@ while True:
                 time.sleep(0.3)
 
         pygame.display.flip()
+        clock.tick(FPS)
         continue
 
     # Draw board
@@ -130,12 +196,14 @@ while True:
             row.append(rect)
         cells.append(row)
 
-    # AI Move button
+    # AI Move button, or Cancel while the AI is thinking
     aiButton = pygame.Rect(
         (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
         (width / 3) - BOARD_PADDING * 2, 50
     )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
+    buttonText = mediumFont.render(
+        "Cancel" if worker.busy else "AI Move", True, BLACK
+    )
     buttonRect = buttonText.get_rect()
     buttonRect.center = aiButton.center
     pygame.draw.rect(screen, WHITE, aiButton)
@@ -153,7 +221,10 @@ while True:
     screen.blit(buttonText, buttonRect)
 
     # Display text
-    text = "Lost" if lost else "Won" if game.mines == flags else ""
+    if worker.busy:
+        text = "Thinking" + "." * (int(time.time() * 2) % 3 + 1)
+    else:
+        text = "Lost" if lost else "Won" if game.mines == flags else ""
     text = mediumFont.render(text, True, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
@@ -161,6 +232,13 @@ while True:
 
     move = None
 
+    # Pick up what the AI learned in the background
+    if worker.busy:
+        done, learned = worker.result()
+        if done:
+            ai = learned
+            learning = None
+
     left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
@@ -178,8 +256,16 @@ while True:
     elif left == 1:
         mouse = pygame.mouse.get_pos()
 
+        # Stop the AI thinking, keeping only that the cell was safe
+        if aiButton.collidepoint(mouse) and worker.busy:
+            worker.cancel()
+            ai.moves_made.add(learning)
+            ai.mark_safe(learning)
+            learning = None
+            time.sleep(0.2)
+
         # If AI button clicked, make an AI move
-        if aiButton.collidepoint(mouse) and not lost:
+        elif aiButton.collidepoint(mouse) and not lost:
             move = ai.make_safe_move()
             if move is None:
                 move = ai.make_random_move()
@@ -194,6 +280,8 @@ while True:
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
+            worker.cancel()
+            learning = None
             game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
             ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
             revealed = set()
@@ -202,7 +290,7 @@ while True:
             continue
 
         # User-made move
-        elif not lost:
+        elif not lost and not worker.busy:
             for i in range(HEIGHT):
                 for j in range(WIDTH):
                     if (cells[i][j].collidepoint(mouse)
@@ -217,6 +305,8 @@ while True:
         else:
             nearby = game.nearby_mines(move)
             revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            learning = move
+            worker.start(learn, ai, move, nearby)
 
     pygame.display.flip()
+    clock.tick(FPS)
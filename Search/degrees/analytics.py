@@ -0,0 +1,221 @@
+"""
+Whole-graph analytics for the degrees data.
+
+One pass over the loaded data computes, instead of millions of
+shortest_path calls:
+
+- the distributions of movies per person and of co-stars per person,
+- the connected components of the co-star graph, by union-find,
+- the average separation and approximate eccentricities, from full
+  breadth-first searches out of a random sample of people.
+
+The co-star counts and the sampled searches are spread over a process
+pool. Each result is appended to the report, as a JSON line, as soon as
+it is known, so a long run can be watched (or stopped) part way.
+
+    python analytics.py large --samples 64 --report analytics.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from array import array
+from collections import Counter
+
+import degrees
+from graph import Graph
+from landmarks import UNREACHABLE, distances_from
+
+# Graph the worker processes share; set before the pool is started
+shared_graph = None
+
+
+def components(graph):
+    """
+    Returns an array mapping each person to the representative of their
+    connected component, found by union-find over each movie's cast.
+    """
+    parent = array("i", range(graph.num_people()))
+    size = array("i", [1]) * graph.num_people()
+
+    def find(person):
+        # Path halving: point every other node at its grandparent
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    for movie in range(graph.num_movies()):
+        stars = graph.stars_of(movie)
+        if len(stars) < 2:
+            continue
+        root = find(stars[0])
+        for star in stars[1:]:
+            other = find(star)
+            if other == root:
+                continue
+            # Union by size, keeping the larger tree's root
+            if size[other] > size[root]:
+                root, other = other, root
+            parent[other] = root
+            size[root] += size[other]
+
+    for person in range(graph.num_people()):
+        parent[person] = find(person)
+    return parent
+
+
+def costar_histogram(people):
+    """
+    Returns a Counter of how many people have each number of distinct
+    co-stars, over a range of people of the shared graph.
+    """
+    histogram = Counter()
+    for person in people:
+        costars = set()
+        for movie in shared_graph.movies_of(person):
+            costars.update(shared_graph.stars_of(movie))
+        costars.discard(person)
+        histogram[len(costars)] += 1
+    return histogram
+
+
+def distance_histogram(source):
+    """
+    Returns (source, histogram) where histogram[d] is the number of people
+    at distance d from `source` in the shared graph.
+    """
+    distances = distances_from(shared_graph, source)
+    reached = len(distances) - distances.count(UNREACHABLE)
+    histogram = []
+    while sum(histogram) < reached:
+        histogram.append(distances.count(len(histogram)))
+    return source, histogram
+
+
+def analyse(graph, report, samples=32, processes=None, seed=0,
+            chunk=10000):
+    """
+    Runs every analysis on `graph`, writing each result to the open file
+    `report` as a JSON line, and returns a summary dict.
+    """
+    global shared_graph
+    shared_graph = graph
+
+    def write(section, **fields):
+        report.write(json.dumps({"section": section, **fields}) + "\n")
+        report.flush()
+
+    started = time.perf_counter()
+    movies_per_person = Counter(
+        len(graph.movies_of(person)) for person in range(graph.num_people())
+    )
+    write("size", people=graph.num_people(), movies=graph.num_movies(),
+          stars=sum(count * movies
+                    for movies, count in movies_per_person.items()))
+    write("movies_per_person", histogram=sorted(movies_per_person.items()))
+
+    roots = components(graph)
+    sizes = Counter(roots)
+    largest_root, largest = sizes.most_common(1)[0] if sizes else (None, 0)
+    write("components", count=len(sizes), largest=largest,
+          sizes=sorted(Counter(sizes.values()).items()))
+
+    # Sample sources from the largest component, where separations are
+    # most meaningful
+    rng = random.Random(seed)
+    in_largest = [person for person in range(graph.num_people())
+                  if roots[person] == largest_root]
+    sources = rng.sample(in_largest, min(samples, len(in_largest)))
+
+    context = multiprocessing.get_context(
+        "fork" if "fork" in multiprocessing.get_all_start_methods()
+        else None
+    )
+    if context.get_start_method() != "fork":
+        # Workers that are not forked cannot see the graph; stay in process
+        processes = 1
+
+    costars = Counter()
+    total_distance = 0
+    pairs = 0
+    eccentricities = []
+    chunks = [range(start, min(start + chunk, graph.num_people()))
+              for start in range(0, graph.num_people(), chunk)]
+    if processes == 1:
+        costar_results = map(costar_histogram, chunks)
+        distance_results = map(distance_histogram, sources)
+        pool = None
+    else:
+        pool = context.Pool(processes)
+        costar_results = pool.imap_unordered(costar_histogram, chunks)
+        distance_results = pool.imap_unordered(distance_histogram, sources)
+
+    try:
+        for source, histogram in distance_results:
+            eccentricity = len(histogram) - 1
+            reached = sum(histogram) - 1
+            distance = sum(depth * count for depth, count in enumerate(histogram))
+            eccentricities.append(eccentricity)
+            total_distance += distance
+            pairs += reached
+            write("sample", person_id=graph.person_ids[source],
+                  eccentricity=eccentricity,
+                  mean_separation=distance / reached if reached else None,
+                  histogram=histogram)
+        for histogram in costar_results:
+            costars.update(histogram)
+        write("costars_per_person", histogram=sorted(costars.items()))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    summary = {
+        "people": graph.num_people(),
+        "components": len(sizes),
+        "largest_component": largest,
+        "samples": len(sources),
+        "mean_separation": total_distance / pairs if pairs else None,
+        "max_sampled_eccentricity": max(eccentricities, default=None),
+        "min_sampled_eccentricity": min(eccentricities, default=None),
+        "mean_costars": (sum(degree * count for degree, count in costars.items())
+                         / max(1, graph.num_people())),
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+    write("summary", **summary)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrees graph analytics")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--report", default="analytics.jsonl",
+                        help="file to stream results to")
+    parser.add_argument("--samples", type=int, default=32,
+                        help="number of people to search from")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact integer graph")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact)
+    graph = degrees.graph
+    if graph is None:
+        graph = Graph.from_dicts(degrees.people, degrees.movies)
+    print("Data loaded.")
+
+    with open(args.report, "w", encoding="utf-8") as report:
+        summary = analyse(graph, report, args.samples, args.processes,
+                          args.seed)
+    for name, value in summary.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
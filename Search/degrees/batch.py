@@ -0,0 +1,137 @@
+"""
+Batch mode for degrees: answer many source/target pairs in one run.
+
+Pairs are read one per line from a file or stdin, as two tab- or
+comma-separated fields that are each a person id or an unambiguous name.
+Results are written to stdout as JSON lines, in input order, as soon as
+they are ready.
+
+The data is loaded once, before the process pool starts. Where processes
+are forked, the workers share the parent's copy of the graph (the
+compact graph is a memory-mapped snapshot, so its pages are shared
+outright); elsewhere each worker maps the snapshot itself.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch degrees queries")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--pairs", default="-",
+                        help="file of source/target pairs (default: stdin)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--strategy", choices=sorted(degrees.STRATEGIES))
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact integer graph")
+    args = parser.parse_args()
+    if args.strategy in ("csr", "alt") and not args.compact:
+        parser.error(f"the {args.strategy} strategy needs --compact")
+
+    load(args.directory, args.compact, args.strategy)
+
+    pairs = sys.stdin if args.pairs == "-" else open(args.pairs, encoding="utf-8")
+    with pairs:
+        for result in run_batch(read_pairs(pairs), args.processes,
+                                args.strategy, args.directory, args.compact):
+            print(json.dumps(result), flush=True)
+
+
+def load(directory, compact, strategy):
+    """
+    Loads the data, and the landmarks if `strategy` needs them.
+    """
+    degrees.load_data(directory, compact=compact)
+    if strategy == "alt":
+        degrees.load_landmarks(directory)
+
+
+def read_pairs(lines):
+    """
+    Yields (source, target) pairs from lines of tab- or comma-separated
+    fields, skipping blank lines.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        delimiter = "\t" if "\t" in line else ","
+        fields = next(csv.reader([line], delimiter=delimiter))
+        if len(fields) != 2:
+            yield (line, None)
+        else:
+            yield (fields[0].strip(), fields[1].strip())
+
+
+def run_batch(pairs, processes=None, strategy=None,
+              directory=None, compact=False):
+    """
+    Yields a result dict for each (source, target) pair, in order.
+
+    The data must already be loaded. `directory` and `compact` are only
+    used to load it again in workers that are not forked.
+    """
+    if processes == 1:
+        for pair in pairs:
+            yield answer((pair, strategy))
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context()
+        initializer, initargs = load, (directory, compact, strategy)
+
+    with context.Pool(processes, initializer, initargs) as pool:
+        yield from pool.imap(
+            answer, ((pair, strategy) for pair in pairs), chunksize=64
+        )
+
+
+def answer(query):
+    """
+    Returns the result dict for one ((source, target), strategy) query.
+    """
+    (source, target), strategy = query
+    result = {"source": source, "target": target}
+    if target is None:
+        result["error"] = "expected a source and a target"
+        return result
+
+    source_id = resolve(source)
+    target_id = resolve(target)
+    for name, person_id in ((source, source_id), (target, target_id)):
+        if person_id is None:
+            result["error"] = f"person not found: {name}"
+            return result
+
+    path = degrees.shortest_path(source_id, target_id, strategy=strategy)
+    result["source_id"] = source_id
+    result["target_id"] = target_id
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    return result
+
+
+def resolve(person):
+    """
+    Returns the person id for an id or an unambiguous name, or None.
+    """
+    if person in degrees.people:
+        return person
+    person_ids = degrees.names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmarks for loading and searching the degrees data.
+
+Each configuration (a way of loading the data, and the strategies to
+try on it) runs in a fresh process, so that its load time and peak
+memory are its own. For every configuration this reports the load time,
+peak resident memory, the time per neighbors_for_person call, and
+per-query latency percentiles and expansion counts for each strategy,
+all over the same random source/target pairs.
+
+    python generate.py synthetic --people 1000000 --movies 400000
+    python benchmark.py synthetic --queries 200
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import degrees
+from graph import SNAPSHOT
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak memory is then not reported
+    resource = None
+
+# Strategies tried for each way of loading, unless --strategies is given.
+# "dfs" is left out by default: on large data it can take minutes a query.
+MODES = {
+    "dict": ["bidirectional", "movies"],
+    "compact": ["csr", "alt"],
+    "compact-cold": ["csr"]
+}
+
+
+def run_configuration(directory, mode, strategies, queries, seed):
+    """
+    Loads the data one way and times queries with each strategy. Meant to
+    run in its own process; returns a dict of results.
+    """
+    compact = mode.startswith("compact")
+    snapshot = os.path.join(directory, SNAPSHOT)
+    if mode == "compact-cold" and os.path.exists(snapshot):
+        # Time a load that has to parse the CSV files and write the snapshot
+        os.remove(snapshot)
+    elif mode == "compact":
+        # Make sure a snapshot exists, so that the timed load maps it
+        degrees.load_data(directory, compact=True)
+
+    started = time.perf_counter()
+    degrees.load_data(directory, compact=compact)
+    load_seconds = time.perf_counter() - started
+    result = {"mode": mode, "load_seconds": round(load_seconds, 3)}
+
+    if "alt" in strategies:
+        started = time.perf_counter()
+        degrees.load_landmarks(directory)
+        result["landmarks_seconds"] = round(time.perf_counter() - started, 3)
+
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids))
+             for _ in range(queries)]
+
+    started = time.perf_counter()
+    for source, _ in pairs:
+        degrees.neighbors_for_person(source)
+    result["neighbors_ms"] = round(
+        (time.perf_counter() - started) * 1000 / max(1, len(pairs)), 4
+    )
+
+    result["strategies"] = {}
+    for strategy in strategies:
+        latencies = []
+        people_expanded = 0
+        movies_expanded = 0
+        for source, target in pairs:
+            stats = {}
+            started = time.perf_counter()
+            degrees.shortest_path(source, target, strategy, stats)
+            latencies.append((time.perf_counter() - started) * 1000)
+            people_expanded += stats["people_expanded"]
+            movies_expanded += stats["movies_expanded"]
+        latencies.sort()
+        result["strategies"][strategy] = {
+            "p50_ms": percentile(latencies, 0.5),
+            "p90_ms": percentile(latencies, 0.9),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": percentile(latencies, 1.0),
+            "mean_people_expanded": people_expanded / max(1, len(pairs)),
+            "mean_movies_expanded": movies_expanded / max(1, len(pairs))
+        }
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def percentile(values, fraction):
+    """
+    Returns the given percentile of a sorted list, or None if it is empty.
+    """
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(fraction * len(values)))], 3)
+
+
+def peak_rss_mb():
+    """
+    Returns this process's peak resident memory in megabytes, or None.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def print_result(result):
+    print(f"{result['mode']}: loaded in {result['load_seconds']}s, "
+          f"peak RSS {result['peak_rss_mb']} MB, "
+          f"neighbors_for_person {result['neighbors_ms']} ms")
+    if "landmarks_seconds" in result:
+        print(f"  landmarks loaded in {result['landmarks_seconds']}s")
+    for strategy, timings in result["strategies"].items():
+        print(f"  {strategy:>13}: p50 {timings['p50_ms']} ms, "
+              f"p90 {timings['p90_ms']} ms, p99 {timings['p99_ms']} ms, "
+              f"max {timings['max_ms']} ms, "
+              f"{timings['mean_people_expanded']:.0f} people / "
+              f"{timings['mean_movies_expanded']:.0f} movies expanded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees")
+    parser.add_argument("directory")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES),
+                        default=["dict", "compact-cold", "compact"])
+    parser.add_argument("--strategies", nargs="+",
+                        choices=sorted(degrees.STRATEGIES),
+                        help="strategies to time (default: all that suit "
+                             "each mode, except dfs)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true",
+                        help="print results as JSON lines")
+    args = parser.parse_args()
+
+    # A fresh interpreter per configuration, so that memory does not carry
+    # over from one to the next
+    context = multiprocessing.get_context("spawn")
+    for mode in args.modes:
+        strategies = args.strategies or MODES[mode]
+        if mode == "dict":
+            strategies = [strategy for strategy in strategies
+                          if strategy not in ("csr", "alt")]
+        with context.Pool(1) as pool:
+            result = pool.apply(run_configuration, (
+                args.directory, mode, strategies, args.queries, args.seed
+            ))
+        if args.json:
+            print(json.dumps(result), flush=True)
+        else:
+            print_result(result)
+
+
+if __name__ == "__main__":
+    main()
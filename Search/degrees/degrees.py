@@ -1,7 +1,16 @@
+import argparse
 import csv
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import Graph, NamesView, PeopleView, MoviesView
+from graph import TreeView
+from graph import bidirectional_search as csr_bidirectional_search
+from graph import search_tree as csr_search_tree
+from landmarks import Landmarks
+from landmarks import alt_search as landmark_alt_search
+from nameindex import NameIndex
+from updates import append_update, read_updates
+from util import Node, DequeStackFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +21,49 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# NameIndex for prefix and approximate name lookups
+name_index = None
 
-def load_data(directory):
+# Compact Graph of the data, when loaded with compact=True
+graph = None
+
+# Landmark distances for the compact graph, when loaded by load_landmarks
+landmarks = None
+
+# Directory the data was loaded from, where updates are journalled
+data_directory = None
+
+
+def load_data(directory, compact=False):
     """
     Load data from CSV files into memory.
+
+    With `compact`, the data is loaded into a Graph instead, and names,
+    people and movies become read-only views onto it. The Graph is cached
+    as a snapshot in the directory and memory-mapped on later loads, for
+    as long as the CSV files are unchanged. Without it, only the name
+    index is cached that way.
+
+    Either way, the updates journalled by add_person, add_movie and
+    add_star are then applied on top of the CSV data.
     """
+    global graph, landmarks, name_index, names, people, movies
+    global data_directory
+    landmarks = None
+    data_directory = directory
+    if compact:
+        graph = Graph.load(directory)
+        names = NamesView(graph)
+        people = PeopleView(graph)
+        movies = MoviesView(graph)
+        name_index = graph.name_index()
+        replay_updates(directory)
+        return
+
+    # Drop any data from an earlier load, including anything added to it
+    graph = None
+    names, people, movies = {}, {}, {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,15 +98,129 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    # Index names for lookups that are not exact
+    person_ids = list(people)
+    name_index = NameIndex.load(
+        directory, [people[person_id]["name"] for person_id in person_ids],
+        person_ids
+    )
+
+    replay_updates(directory)
+
+
+def replay_updates(directory):
+    """
+    Apply the updates journalled in `directory` to the loaded data. Rows
+    that do not apply, such as a star of an unknown person, are skipped
+    as load_data skips them in stars.csv.
+    """
+    for kind, *fields in read_updates(directory):
+        try:
+            if kind == "person" and len(fields) == 3:
+                add_person(*fields, journal=False)
+            elif kind == "movie" and len(fields) == 3:
+                add_movie(*fields, journal=False)
+            elif kind == "star" and len(fields) == 2:
+                add_star(*fields, journal=False)
+        except (KeyError, ValueError):
+            pass
+
+
+def load_landmarks(directory, count=16):
+    """
+    Load the landmark index for the compact data from `directory`,
+    building and saving it alongside the data if needed.
+    """
+    global landmarks
+    if graph is None:
+        raise ValueError("landmarks need load_data(directory, compact=True)")
+    landmarks = Landmarks.load(directory, graph, count)
+
+
+def add_person(person_id, name, birth, journal=True):
+    """
+    Add a person to the loaded data, and to the names and landmarks.
+
+    With `journal`, the person is also recorded in the data directory, so
+    that they are there the next time it is loaded. Raises ValueError if
+    the person_id is taken.
+    """
+    if person_id in people:
+        raise ValueError(f"person {person_id} already exists")
+    if graph is not None:
+        graph.add_person(person_id, name, birth)
+        if landmarks is not None:
+            landmarks.add_person()
+    else:
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        names.setdefault(name.lower(), set()).add(person_id)
+        name_index.names.append(name)
+        name_index.ids.append(person_id)
+        name_index.add(len(name_index.names) - 1)
+    if journal:
+        append_update(data_directory, "person", person_id, name, birth)
+
+
+def add_movie(movie_id, title, year, journal=True):
+    """
+    Add a movie to the loaded data, recording it in the data directory
+    with `journal`. Raises ValueError if the movie_id is taken.
+    """
+    if movie_id in movies:
+        raise ValueError(f"movie {movie_id} already exists")
+    if graph is not None:
+        graph.add_movie(movie_id, title, year)
+    else:
+        movies[movie_id] = {"title": title, "year": year, "stars": set()}
+    if journal:
+        append_update(data_directory, "movie", movie_id, title, year)
+
+
+def add_star(person_id, movie_id, journal=True):
+    """
+    Record that a person starred in a movie, repairing the landmark
+    distances, and with `journal` in the data directory too. Returns False
+    if this was already known. Raises KeyError for an unknown person or
+    movie.
+    """
+    if graph is not None:
+        person = graph.person_index(person_id)
+        movie = graph.movie_index(movie_id)
+        if person is None or movie is None:
+            raise KeyError(person_id if person is None else movie_id)
+        if not graph.add_star(person, movie):
+            return False
+        if landmarks is not None:
+            landmarks.repair(graph, movie)
+    else:
+        if movie_id in people[person_id]["movies"]:
+            return False
+        movies[movie_id]["stars"].add(person_id)
+        people[person_id]["movies"].add(movie_id)
+    if journal:
+        append_update(data_directory, "star", person_id, movie_id)
+    return True
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Degrees of separation")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES),
+                        help="search used to find the path")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact integer graph")
+    parser.add_argument("--stats", action="store_true",
+                        help="report how many people and movies the search "
+                             "expanded")
+    args = parser.parse_args()
+    if args.strategy in ("csr", "alt") and not args.compact:
+        parser.error(f"the {args.strategy} strategy needs --compact")
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact)
+    if args.strategy == "alt":
+        load_landmarks(args.directory)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -70,7 +231,11 @@ def main():
         sys.exit("Person not found.")
 
     print("Looking for path...")
-    path = shortest_path(source, target)
+    stats = {} if args.stats else None
+    path = shortest_path(source, target, strategy=args.strategy, stats=stats)
+    if stats is not None:
+        print(f"{stats['people_expanded']} people and "
+              f"{stats['movies_expanded']} movies expanded.")
 
     if path is None:
         print("Not connected.")
@@ -85,12 +250,32 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, strategy=None, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    `strategy` names one of the searches in STRATEGIES, by default "csr"
+    when the data was loaded compact and "bidirectional" otherwise. If
+    `stats` is a dict, its "people_expanded" and "movies_expanded" entries
+    are set to the number of people and movies the search expanded.
+    """
+    if strategy is None:
+        strategy = "bidirectional" if graph is None else "csr"
+    if strategy not in STRATEGIES:
+        raise ValueError(f"unknown search strategy: {strategy}")
+    if stats is not None:
+        stats["people_expanded"] = 0
+        stats["movies_expanded"] = 0
+    return STRATEGIES[strategy](source, target, stats)
+
+
+def depth_first_search(source, target, stats=None):
+    """
+    Original single-ended search off a stack frontier. It finds a
+    connection, but not necessarily the shortest one.
     """
 
     # Store explored people ad movies to avoid infinite loops or extra checks
@@ -98,7 +283,7 @@ def shortest_path(source, target):
 
     # Initialize frontier with the source person
     start = Node(state=source, parent=None, action=None)
-    frontier = StackFrontier()
+    frontier = DequeStackFrontier()
     frontier.add(start)
 
     if source == target:
@@ -116,6 +301,9 @@ def shortest_path(source, target):
 
         # Mark person as explored
         exploredPeople.add(node.state)
+        if stats is not None:
+            stats["people_expanded"] += 1
+            stats["movies_expanded"] += len(people[node.state]["movies"])
 
         # Add neighbors to frontier
         for action, state in neighbors_for_person(node.state):
@@ -133,37 +321,314 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def bidirectional_search(source, target, stats=None):
+    """
+    Breadth-first search grown from the source and the target at once,
+    one whole layer at a time from whichever side has the smaller
+    frontier, until the two searches meet in the middle.
+    """
+    if source == target:
+        return []
+
+    # Each side maps a reached person to the (movie_id, person_id) step
+    # leading back towards its root, and to its distance from that root
+    parents = [{source: None}, {target: None}]
+    depths = [{source: 0}, {target: 0}]
+    frontiers = [[source], [target]]
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+
+        # Expand the whole layer before stopping, so that the best meeting
+        # point is chosen rather than the first one found
+        layer = []
+        meeting = None
+        for person_id in frontiers[side]:
+            if stats is not None:
+                stats["people_expanded"] += 1
+                stats["movies_expanded"] += len(people[person_id]["movies"])
+            depth = depths[side][person_id] + 1
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in parents[side]:
+                    continue
+                parents[side][neighbor_id] = (movie_id, person_id)
+                depths[side][neighbor_id] = depth
+                layer.append(neighbor_id)
+                if neighbor_id in depths[other]:
+                    length = depth + depths[other][neighbor_id]
+                    if meeting is None or length < meeting[0]:
+                        meeting = (length, neighbor_id)
+
+        if meeting is not None:
+            return join_paths(meeting[1], parents[0], parents[1])
+        frontiers[side] = layer
+
+    return None
+
+
+def movie_search(source, target, stats=None):
+    """
+    Bidirectional breadth-first search that treats movies as nodes of
+    their own. Each side expands a movie only the first time one of its
+    stars reaches it, since every later expansion would only find the
+    same stars again, and walks the people and movies dicts directly
+    instead of building a neighbor set for every person.
+    """
+    if source == target:
+        return []
+
+    parents = [{source: None}, {target: None}]
+    depths = [{source: 0}, {target: 0}]
+    expanded = [set(), set()]
+    frontiers = [[source], [target]]
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+
+        layer = []
+        meeting = None
+        for person_id in frontiers[side]:
+            if stats is not None:
+                stats["people_expanded"] += 1
+            depth = depths[side][person_id] + 1
+            for movie_id in people[person_id]["movies"]:
+                if movie_id in expanded[side]:
+                    continue
+                expanded[side].add(movie_id)
+                if stats is not None:
+                    stats["movies_expanded"] += 1
+                for neighbor_id in movies[movie_id]["stars"]:
+                    if neighbor_id in parents[side]:
+                        continue
+                    parents[side][neighbor_id] = (movie_id, person_id)
+                    depths[side][neighbor_id] = depth
+                    layer.append(neighbor_id)
+                    if neighbor_id in depths[other]:
+                        length = depth + depths[other][neighbor_id]
+                        if meeting is None or length < meeting[0]:
+                            meeting = (length, neighbor_id)
+
+        if meeting is not None:
+            return join_paths(meeting[1], parents[0], parents[1])
+        frontiers[side] = layer
+
+    return None
+
+
+def csr_search(source, target, stats=None):
+    """
+    Bidirectional breadth-first search over the compact graph. The
+    person ids are translated to integers on the way in, and the path
+    back to string ids on the way out.
+    """
+    if graph is None:
+        raise ValueError("csr search needs load_data(directory, compact=True)")
+    source, target = person_indices(source, target)
+    path = csr_bidirectional_search(graph, source, target, stats)
+    return person_path_ids(path)
+
+
+def alt_search(source, target, stats=None):
+    """
+    Bidirectional search over the compact graph, cut short by the
+    landmark bounds.
+    """
+    if landmarks is None:
+        raise ValueError("alt search needs load_landmarks(directory)")
+    source, target = person_indices(source, target)
+    path = landmark_alt_search(graph, landmarks, source, target, stats)
+    return person_path_ids(path)
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between two
+    people from the landmark index, without searching. Both are math.inf
+    if the people are known not to be connected.
+    """
+    if landmarks is None:
+        raise ValueError("separation bounds need load_landmarks(directory)")
+    return landmarks.bounds(*person_indices(source, target))
+
+
+def within_degrees(source, target, degrees):
+    """
+    Returns whether two people are within `degrees` degrees of separation,
+    from the landmark bounds when they decide it, and otherwise by an
+    exact search.
+    """
+    if landmarks is None:
+        raise ValueError("within_degrees needs load_landmarks(directory)")
+    within = landmarks.within(*person_indices(source, target), degrees)
+    if within is None:
+        path = alt_search(source, target)
+        within = path is not None and len(path) <= degrees
+    return within
+
+
+def person_indices(*person_ids):
+    """
+    Returns the compact graph's integers for person ids.
+    """
+    indices = []
+    for person_id in person_ids:
+        person = graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        indices.append(person)
+    return indices
+
+
+def person_path_ids(path):
+    """
+    Translates a compact graph path of (movie, person) integers back to
+    (movie_id, person_id) pairs.
+    """
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def join_paths(person_id, forward, backward):
+    """
+    Returns the (movie_id, person_id) path through the person where a
+    forward and a backward search met.
+    """
+    path = []
+    current = person_id
+    while forward[current] is not None:
+        movie_id, parent_id = forward[current]
+        path.append((movie_id, current))
+        current = parent_id
+    path.reverse()
+
+    current = person_id
+    while backward[current] is not None:
+        movie_id, next_id = backward[current]
+        path.append((movie_id, next_id))
+        current = next_id
+    return path
+
+
+def search_tree(source):
+    """
+    Runs one breadth-first search from `source` over everyone it can
+    reach, and returns a mapping from each of them to the (movie_id,
+    person_id) step back towards the source (None for the source).
+    """
+    if graph is not None:
+        root = person_indices(source)[0]
+        return TreeView(graph, root, *csr_search_tree(graph, root))
+
+    parents = {source: None}
+    expanded = set()
+    layer = [source]
+    while layer:
+        following = []
+        for person_id in layer:
+            for movie_id in people[person_id]["movies"]:
+                if movie_id in expanded:
+                    continue
+                expanded.add(movie_id)
+                for neighbor_id in movies[movie_id]["stars"]:
+                    if neighbor_id not in parents:
+                        parents[neighbor_id] = (movie_id, person_id)
+                        following.append(neighbor_id)
+        layer = following
+    return parents
+
+
+def path_from_tree(tree, person_id):
+    """
+    Returns the (movie_id, person_id) path from `person_id` to the root of
+    a search_tree, or None if the tree does not reach them.
+
+    Reversed with reverse_path, it is the path from the root instead.
+    """
+    if person_id not in tree:
+        return None
+    path = []
+    while tree[person_id] is not None:
+        path.append(tree[person_id])
+        person_id = tree[person_id][1]
+    return path
+
+
+def reverse_path(source, path):
+    """
+    Returns a path from `source` walked in the opposite direction, from
+    its last person back to `source`.
+    """
+    people_on_path = [source] + [person_id for _, person_id in path]
+    return [(movie_id, people_on_path[i])
+            for i, (movie_id, _) in reversed(list(enumerate(path)))]
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If nobody has exactly that name, the closest matches are offered.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
-        return None
+        person_ids = [person_id for person_id, _, _ in find_people(name)]
+        if len(person_ids) == 0:
+            return None
+        print(f"No one named '{name}'. Did you mean:")
+        return choose_person(person_ids)
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
+        return choose_person(person_ids)
     else:
         return person_ids[0]
 
 
+def choose_person(person_ids):
+    """
+    Lists the given people and returns the id the user picks, or None.
+    """
+    for person_id in person_ids:
+        person = people[person_id]
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
+def find_people(name, limit=10):
+    """
+    Returns up to `limit` (person_id, name, score) candidates for a name,
+    best first: exact matches, then names starting with it, then names
+    that are spelled similarly. Scores are between 0 and 1.
+    """
+    return [
+        (name_index.ids[person], name_index.names[person], score)
+        for person, score in name_index.search(name, limit)
+    ]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index(person_id))
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -172,5 +637,15 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+# Searches available to shortest_path, by name
+STRATEGIES = {
+    "alt": alt_search,
+    "bidirectional": bidirectional_search,
+    "csr": csr_search,
+    "dfs": depth_first_search,
+    "movies": movie_search,
+}
+
+
 if __name__ == "__main__":
     main()
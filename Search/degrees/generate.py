@@ -0,0 +1,109 @@
+"""
+Synthetic dataset generator for degrees.
+
+Writes people.csv, movies.csv and stars.csv in the same format as the
+IMDB data, at any size. Cast sizes follow a power law (most movies have
+a handful of credited stars, a few have hundreds), and so does how often
+each person is cast, so the graph has the same hubs and long tail that
+make the real data hard to search.
+
+    python generate.py synthetic --people 1000000 --movies 400000
+"""
+
+import argparse
+import csv
+import os
+import random
+
+FIRST_NAMES = [
+    "Adam", "Alice", "Anna", "Ben", "Carla", "Chris", "Dana", "David",
+    "Elena", "Emma", "Frank", "Grace", "Hana", "Ivan", "Jack", "James",
+    "Julia", "Kate", "Kevin", "Laura", "Leo", "Maria", "Mark", "Nina",
+    "Omar", "Paul", "Rosa", "Sam", "Sara", "Tom", "Vera", "Will"
+]
+LAST_NAMES = [
+    "Adams", "Bacon", "Baker", "Brown", "Chen", "Clark", "Cruise", "Davis",
+    "Evans", "Garcia", "Green", "Hall", "Hanks", "Hill", "Jones", "King",
+    "Kim", "Lee", "Lopez", "Martin", "Moore", "Nguyen", "Novak", "Patel",
+    "Rossi", "Sato", "Scott", "Silva", "Smith", "Taylor", "Walker", "Young"
+]
+TITLE_WORDS = [
+    "Apollo", "Bride", "City", "Dark", "Echo", "Fire", "Gold", "Harbor",
+    "Island", "Journey", "King", "Last", "Men", "Night", "Ocean", "Prince",
+    "Queen", "River", "Silent", "Time", "Under", "Valley", "Winter", "Zero"
+]
+
+
+def generate(directory, people=100000, movies=40000, cast_shape=1.5,
+             min_cast=2, max_cast=500, popularity=2.0, seed=0):
+    """
+    Writes a synthetic dataset to `directory` and returns the number of
+    star rows written.
+
+    Cast sizes are Pareto distributed with shape `cast_shape`, scaled so
+    the smallest cast is `min_cast` and capped at `max_cast`. Cast members
+    are drawn so that the person at fraction x of the list is cast in
+    proportion to x ** (1 / popularity - 1): the larger `popularity`, the
+    more the same few people appear in everything.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        f.write("id,name,birth\n")
+        for person in range(people):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            writer.writerow([person + 1, name, rng.randint(1900, 2010)])
+
+    stars = 0
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as movies_file, \
+            open(os.path.join(directory, "stars.csv"), "w",
+                 encoding="utf-8", newline="") as stars_file:
+        movies_writer = csv.writer(movies_file, quoting=csv.QUOTE_NONNUMERIC)
+        stars_writer = csv.writer(stars_file)
+        movies_file.write("id,title,year\n")
+        stars_file.write("person_id,movie_id\n")
+        for movie in range(movies):
+            movie_id = movie + 1
+            title = " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3)))
+            movies_writer.writerow([movie_id, title, rng.randint(1920, 2020)])
+
+            cast_size = min(max_cast, people,
+                            int(min_cast * rng.paretovariate(cast_shape)))
+            cast = set()
+            while len(cast) < cast_size:
+                cast.add(int(people * rng.random() ** popularity))
+            for person in cast:
+                stars_writer.writerow([person + 1, movie_id])
+            stars += len(cast)
+    return stars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate degrees data")
+    parser.add_argument("directory")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=40000)
+    parser.add_argument("--cast-shape", type=float, default=1.5,
+                        help="Pareto shape of cast sizes (smaller is "
+                             "heavier tailed)")
+    parser.add_argument("--min-cast", type=int, default=2)
+    parser.add_argument("--max-cast", type=int, default=500)
+    parser.add_argument("--popularity", type=float, default=2.0,
+                        help="skew of how often people are cast (1 is "
+                             "uniform)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stars = generate(args.directory, args.people, args.movies,
+                     args.cast_shape, args.min_cast, args.max_cast,
+                     args.popularity, args.seed)
+    print(f"Wrote {args.people} people, {args.movies} movies and "
+          f"{stars} stars to {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
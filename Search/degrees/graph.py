@@ -0,0 +1,713 @@
+"""
+Compact, integer-indexed representation of the degrees dataset.
+
+People and movies are interned to dense integers (their row in the CSV
+files), and the person <-> movie incidence is held in CSR form: two
+pairs of offset and index arrays instead of dicts of sets. Searches run
+on the integers, and string ids are only looked up again when a result
+is handed back to the caller.
+"""
+
+import csv
+import os
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+
+import nameindex
+from nameindex import NameIndex
+from snapshot import open_snapshot, source_signature
+from snapshot import write_snapshot
+
+# Files a dataset directory is loaded from, and the snapshot cached there
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+SNAPSHOT = "degrees.snapshot"
+
+# Version of the snapshot contents, bumped whenever sections are added
+SNAPSHOT_VERSION = 2
+
+
+class Graph():
+    """
+    People and movies of a dataset, in CSR form.
+
+    The movies of person p are
+        person_movies[person_offsets[p]:person_offsets[p + 1]]
+    and the stars of movie m are
+        movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+
+    People, movies and stars added after the graph was built are kept
+    apart from the CSR arrays, which may be a read-only mapping: new rows
+    are appended to the id and name sequences, and new stars are held in
+    the added_movies and added_stars dicts until the graph is saved.
+    movies_of and stars_of include them.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        # Reverse lookups from string ids: dicts when the graph was built
+        # in memory, or arrays of indices sorted by id when it was mapped
+        # from a snapshot. Either is built on first use if missing.
+        self._person_index = None
+        self._movie_index = None
+        self._person_order = None
+        self._movie_order = None
+
+        # NameIndex of the people's names, built on first use
+        self._name_index = None
+
+        # Ids of people and movies added to a graph without index dicts
+        self._added_person_index = {}
+        self._added_movie_index = {}
+
+        # Stars added since the CSR arrays were built, by person and movie
+        self.added_movies = {}
+        self.added_stars = {}
+
+    @classmethod
+    def load(cls, directory, cache=True):
+        """
+        Load the graph for `directory`, from its snapshot if there is an
+        up-to-date one, and otherwise from the CSV files.
+
+        With `cache`, a graph loaded from CSV is written back as a snapshot
+        for the next run. A snapshot is stale once any of the CSV files
+        changes size or modification time.
+        """
+        path = os.path.join(directory, SNAPSHOT)
+        sources = source_signature(directory, SOURCES)
+        meta = {"version": SNAPSHOT_VERSION, "sources": sources}
+        if cache:
+            snapshot = open_snapshot(path)
+            if snapshot is not None and snapshot.meta == meta:
+                return cls.from_snapshot(snapshot)
+
+        graph = cls.from_csv(directory)
+        if cache:
+            try:
+                graph.save(path, meta)
+            except OSError:
+                # A read-only dataset directory just means no cache
+                pass
+        return graph
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Build a graph whose arrays are views onto a memory-mapped Snapshot.
+        """
+        graph = cls(*(snapshot[name] for name in GRAPH_SECTIONS))
+        graph._person_order = snapshot["person_order"]
+        graph._movie_order = snapshot["movie_order"]
+        if all(name in snapshot for name in nameindex.SECTIONS):
+            graph._name_index = NameIndex.from_snapshot(
+                snapshot, graph.person_names, graph.person_ids
+            )
+        return graph
+
+    def save(self, path, meta=None):
+        """
+        Write the graph to a snapshot at `path`, folding any added people,
+        movies and stars into the CSR arrays.
+        """
+        graph = self.merged() if self.has_updates() else self
+        sections = {name: getattr(graph, name) for name in GRAPH_SECTIONS}
+        sections["person_order"] = graph.person_order()
+        sections["movie_order"] = graph.movie_order()
+        sections.update(graph.name_index().sections())
+        write_snapshot(path, sections, meta)
+
+    def has_updates(self):
+        """
+        Returns whether anything was added since the CSR arrays were built.
+        """
+        return (self.num_people() != len(self.person_offsets) - 1
+                or self.num_movies() != len(self.movie_offsets) - 1
+                or bool(self.added_movies))
+
+    def merged(self):
+        """
+        Returns a new graph with everything added folded into its arrays.
+        """
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person in range(self.num_people()):
+            movies = self.movies_of(person)
+            edge_people.extend(array("i", [person]) * len(movies))
+            edge_movies.extend(movies)
+        return Graph.from_edges(
+            list(self.person_ids), list(self.person_names),
+            list(self.person_births), list(self.movie_ids),
+            list(self.movie_titles), list(self.movie_years),
+            edge_people, edge_movies
+        )
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Load a graph straight from the CSV files in `directory`, without
+        building the dicts that degrees.load_data uses.
+        """
+        person_ids, person_names, person_births = [], [], []
+        person_index = {}
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person_index[row["id"]] = len(person_ids)
+                person_ids.append(row["id"])
+                person_names.append(row["name"])
+                person_births.append(row["birth"])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        movie_index = {}
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                movie_index[row["id"]] = len(movie_ids)
+                movie_ids.append(row["id"])
+                movie_titles.append(row["title"])
+                movie_years.append(row["year"])
+
+        # Stars referring to unknown people or movies are skipped, as
+        # load_data does
+        edge_people = array("i")
+        edge_movies = array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is not None and movie is not None:
+                    edge_people.append(person)
+                    edge_movies.append(movie)
+
+        graph = cls.from_edges(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            edge_people, edge_movies
+        )
+        graph._person_index = person_index
+        graph._movie_index = movie_index
+        return graph
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build a graph from the `people` and `movies` dicts of degrees.py.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, person in people.items():
+            for movie_id in person["movies"]:
+                edge_people.append(person_index[person_id])
+                edge_movies.append(movie_index[movie_id])
+
+        graph = cls.from_edges(
+            person_ids,
+            [people[person_id]["name"] for person_id in person_ids],
+            [people[person_id]["birth"] for person_id in person_ids],
+            movie_ids,
+            [movies[movie_id]["title"] for movie_id in movie_ids],
+            [movies[movie_id]["year"] for movie_id in movie_ids],
+            edge_people, edge_movies
+        )
+        graph._person_index = person_index
+        graph._movie_index = movie_index
+        return graph
+
+    @classmethod
+    def from_edges(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   edge_people, edge_movies):
+        """
+        Build a graph from parallel arrays of (person, movie) edges.
+        Duplicate edges are dropped.
+        """
+        person_offsets, person_movies = to_csr(
+            len(person_ids), edge_people, edge_movies
+        )
+
+        # Transpose the person rows to get the movie rows. The person rows
+        # are already free of duplicates, so these are too.
+        edge_people = array("i")
+        for person in range(len(person_ids)):
+            count = person_offsets[person + 1] - person_offsets[person]
+            edge_people.extend(array("i", [person]) * count)
+        movie_offsets, movie_stars = to_csr(
+            len(movie_ids), person_movies, edge_people
+        )
+
+        return cls(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            person_offsets, person_movies, movie_offsets, movie_stars
+        )
+
+    def num_people(self):
+        return len(self.person_ids)
+
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person and returns their integer. The name index, if built,
+        is updated too.
+        """
+        if self.person_index(person_id) is not None:
+            raise ValueError(f"person {person_id} already exists")
+        person = self.num_people()
+        for attribute, value in (("person_ids", person_id),
+                                 ("person_names", name),
+                                 ("person_births", birth)):
+            appendable(self, attribute).append(value)
+        if self._person_index is not None:
+            self._person_index[person_id] = person
+        else:
+            self._added_person_index[person_id] = person
+        if self._name_index is not None:
+            # The columns may have been wrapped to append to them
+            self._name_index.names = self.person_names
+            self._name_index.ids = self.person_ids
+            self._name_index.add(person)
+        return person
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie and returns its integer.
+        """
+        if self.movie_index(movie_id) is not None:
+            raise ValueError(f"movie {movie_id} already exists")
+        movie = self.num_movies()
+        for attribute, value in (("movie_ids", movie_id),
+                                 ("movie_titles", title),
+                                 ("movie_years", year)):
+            appendable(self, attribute).append(value)
+        if self._movie_index is not None:
+            self._movie_index[movie_id] = movie
+        else:
+            self._added_movie_index[movie_id] = movie
+        return movie
+
+    def add_star(self, person, movie):
+        """
+        Records that a person starred in a movie. Returns False if that was
+        already known.
+        """
+        if movie in self.movies_of(person):
+            return False
+        self.added_movies.setdefault(person, []).append(movie)
+        self.added_stars.setdefault(movie, []).append(person)
+        return True
+
+    def person_index(self, person_id):
+        """
+        Returns the integer for a person's string id, or None.
+        """
+        if self._person_index is not None:
+            return self._person_index.get(person_id)
+        if person_id in self._added_person_index:
+            return self._added_person_index[person_id]
+        return search_order(self.person_order(), self.person_ids, person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the integer for a movie's string id, or None.
+        """
+        if self._movie_index is not None:
+            return self._movie_index.get(movie_id)
+        if movie_id in self._added_movie_index:
+            return self._added_movie_index[movie_id]
+        return search_order(self.movie_order(), self.movie_ids, movie_id)
+
+    def person_order(self):
+        """
+        Returns the people's integers, sorted by their string ids. People
+        added since the order was built are not in it.
+        """
+        if self._person_order is None:
+            self._person_order = sort_order(self.person_ids)
+        return self._person_order
+
+    def movie_order(self):
+        """
+        Returns the movies' integers, sorted by their string ids. Movies
+        added since the order was built are not in it.
+        """
+        if self._movie_order is None:
+            self._movie_order = sort_order(self.movie_ids)
+        return self._movie_order
+
+    def name_index(self):
+        """
+        Returns the NameIndex of the people's names.
+        """
+        if self._name_index is None:
+            self._name_index = NameIndex.build(
+                self.person_names, self.person_ids
+            )
+        return self._name_index
+
+    def movies_of(self, person):
+        if person < len(self.person_offsets) - 1:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        else:
+            movies = ()
+        if self.added_movies and person in self.added_movies:
+            return list(movies) + self.added_movies[person]
+        return movies
+
+    def stars_of(self, movie):
+        if movie < len(self.movie_offsets) - 1:
+            stars = self.movie_stars[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        else:
+            stars = ()
+        if self.added_stars and movie in self.added_stars:
+            return list(stars) + self.added_stars[movie]
+        return stars
+
+    def neighbors(self, person):
+        """
+        Returns (movie, person) pairs for people who starred with a given
+        person, including the person themself.
+        """
+        return [
+            (movie, star)
+            for movie in self.movies_of(person)
+            for star in self.stars_of(movie)
+        ]
+
+    def people_named(self, name):
+        """
+        Returns the people whose name matches `name`, ignoring case.
+        """
+        return self.name_index().exact(name)
+
+
+# Graph attributes stored in a snapshot, in constructor order
+GRAPH_SECTIONS = (
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+    "person_offsets", "person_movies", "movie_offsets", "movie_stars"
+)
+
+
+class Appended(Sequence):
+    """
+    A read-only sequence, such as a StringTable mapped from a snapshot,
+    with more items appended after it.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.added = []
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < len(self.base):
+            return self.base[i]
+        return self.added[i - len(self.base)]
+
+    def __len__(self):
+        return len(self.base) + len(self.added)
+
+    def append(self, item):
+        self.added.append(item)
+
+
+def appendable(graph, attribute):
+    """
+    Returns a graph's sequence attribute, first wrapping it in Appended if
+    it cannot be appended to.
+    """
+    sequence = getattr(graph, attribute)
+    if not hasattr(sequence, "append"):
+        sequence = Appended(sequence)
+        setattr(graph, attribute, sequence)
+    return sequence
+
+
+def sort_order(ids):
+    """
+    Returns an array of the indices of `ids`, sorted by id.
+    """
+    return array("i", sorted(range(len(ids)), key=ids.__getitem__))
+
+
+def search_order(order, ids, key):
+    """
+    Returns the index of `key` in `ids` by binary search over `order`, the
+    indices of `ids` in sorted order, or None if it is not there.
+    """
+    i = bisect_left(order, key, key=ids.__getitem__)
+    if i < len(order) and ids[order[i]] == key:
+        return order[i]
+    return None
+
+
+def to_csr(rows, edge_rows, edge_cols):
+    """
+    Returns (offsets, indices) arrays for the edges (edge_rows[i],
+    edge_cols[i]) of a matrix with `rows` rows. Each row is sorted and
+    duplicate edges are removed.
+    """
+    counts = array("i", [0]) * (rows + 1)
+    for row in edge_rows:
+        counts[row + 1] += 1
+    for row in range(rows):
+        counts[row + 1] += counts[row]
+
+    # Scatter the edges into their rows
+    indices = array("i", [0]) * len(edge_cols)
+    fill = counts[:-1]
+    for row, col in zip(edge_rows, edge_cols):
+        indices[fill[row]] = col
+        fill[row] += 1
+
+    # Sort each row and squeeze out duplicates
+    offsets = array("i", [0]) * (rows + 1)
+    end = 0
+    for row in range(rows):
+        cols = sorted(set(indices[counts[row]:counts[row + 1]]))
+        indices[end:end + len(cols)] = array("i", cols)
+        end += len(cols)
+        offsets[row + 1] = end
+    del indices[end:]
+    return offsets, indices
+
+
+def bidirectional_search(graph, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) integer pairs that
+    connect person `source` to person `target`, or None.
+
+    Works like degrees.movie_search, but over the CSR arrays: each side
+    expands a movie at most once.
+    """
+    if source == target:
+        return []
+
+    parents = [{source: None}, {target: None}]
+    depths = [{source: 0}, {target: 0}]
+    expanded = [set(), set()]
+    frontiers = [[source], [target]]
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen = parents[side]
+        depth_of = depths[side]
+        other_depth_of = depths[1 - side]
+        expanded_movies = expanded[side]
+
+        layer = []
+        meeting = None
+        for person in frontiers[side]:
+            if stats is not None:
+                stats["people_expanded"] += 1
+            depth = depth_of[person] + 1
+            for movie in graph.movies_of(person):
+                if movie in expanded_movies:
+                    continue
+                expanded_movies.add(movie)
+                if stats is not None:
+                    stats["movies_expanded"] += 1
+                for star in graph.stars_of(movie):
+                    if star in seen:
+                        continue
+                    seen[star] = (movie, person)
+                    depth_of[star] = depth
+                    layer.append(star)
+                    if star in other_depth_of:
+                        length = depth + other_depth_of[star]
+                        if meeting is None or length < meeting[0]:
+                            meeting = (length, star)
+
+        if meeting is not None:
+            return join_paths(meeting[1], parents[0], parents[1])
+        frontiers[side] = layer
+
+    return None
+
+
+def join_paths(person, forward, backward):
+    """
+    Returns the (movie, person) path through the person where a forward
+    and a backward search met.
+    """
+    path = []
+    current = person
+    while forward[current] is not None:
+        movie, parent = forward[current]
+        path.append((movie, current))
+        current = parent
+    path.reverse()
+
+    current = person
+    while backward[current] is not None:
+        movie, following = backward[current]
+        path.append((movie, following))
+        current = following
+    return path
+
+
+def search_tree(graph, source):
+    """
+    Breadth-first search from `source` over everyone it can reach.
+
+    Returns (parent_people, parent_movies) arrays: for each person reached,
+    the person one step closer to `source` and the movie they share. The
+    source is its own parent, and people not reached have parent -1.
+    """
+    parent_people = array("i", [-1]) * graph.num_people()
+    parent_movies = array("i", [-1]) * graph.num_people()
+    expanded = bytearray(graph.num_movies())
+    parent_people[source] = source
+    layer = [source]
+    while layer:
+        following = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                for star in graph.stars_of(movie):
+                    if parent_people[star] == -1:
+                        parent_people[star] = person
+                        parent_movies[star] = movie
+                        following.append(star)
+        layer = following
+    return parent_people, parent_movies
+
+
+class TreeView(Mapping):
+    """
+    Read-only mapping shaped like degrees.search_tree's dicts, backed by
+    the arrays of a compact search_tree.
+    """
+
+    def __init__(self, graph, source, parent_people, parent_movies):
+        self.graph = graph
+        self.source = source
+        self.parent_people = parent_people
+        self.parent_movies = parent_movies
+
+    def __getitem__(self, person_id):
+        person = self.graph.person_index(person_id)
+        if person is None or self.parent_people[person] == -1:
+            raise KeyError(person_id)
+        if person == self.source:
+            return None
+        return (self.graph.movie_ids[self.parent_movies[person]],
+                self.graph.person_ids[self.parent_people[person]])
+
+    def __iter__(self):
+        for person, parent in enumerate(self.parent_people):
+            if parent != -1:
+                yield self.graph.person_ids[person]
+
+    def __len__(self):
+        return len(self.parent_people) - self.parent_people.count(-1)
+
+
+class PeopleView(Mapping):
+    """
+    Read-only mapping shaped like degrees.people, backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+    def __getitem__(self, person_id):
+        person = self.graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        return {
+            "name": self.graph.person_names[person],
+            "birth": self.graph.person_births[person],
+            "movies": {
+                self.graph.movie_ids[movie]
+                for movie in self.graph.movies_of(person)
+            }
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people()
+
+
+class MoviesView(Mapping):
+    """
+    Read-only mapping shaped like degrees.movies, backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+    def __getitem__(self, movie_id):
+        movie = self.graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        return {
+            "title": self.graph.movie_titles[movie],
+            "year": self.graph.movie_years[movie],
+            "stars": {
+                self.graph.person_ids[star]
+                for star in self.graph.stars_of(movie)
+            }
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies()
+
+
+class NamesView(Mapping):
+    """
+    Read-only mapping shaped like degrees.names, backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        people = self.graph.people_named(name)
+        if not people:
+            raise KeyError(name)
+        return {self.graph.person_ids[person] for person in people}
+
+    def __iter__(self):
+        return iter({name.lower() for name in self.graph.person_names})
+
+    def __len__(self):
+        return len({name.lower() for name in self.graph.person_names})
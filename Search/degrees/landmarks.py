@@ -0,0 +1,408 @@
+"""
+Landmark distance oracle for the compact degrees graph.
+
+A handful of well-connected people are chosen as landmarks, and the
+distance from each of them to every person is computed once by
+breadth-first search and saved next to the dataset. By the triangle
+inequality, for any landmark L
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the distances give lower and upper bounds on the separation of any
+pair in O(landmarks) time. Exact searches use them to stop early: once
+the layers searched rule out anything shorter than the upper bound, the
+path through the landmark that gives it is a shortest one.
+
+Adding people and stars only ever shortens distances, so the saved
+distances are repaired for the updates journalled since they were built
+rather than computed again.
+"""
+
+import argparse
+import math
+import os
+import sys
+from array import array
+
+from graph import SOURCES, join_paths
+from snapshot import open_snapshot, source_signature, write_snapshot
+from updates import journal_size, read_updates
+
+# Snapshot the landmark distances are saved in, next to the dataset
+LANDMARKS = "landmarks.snapshot"
+
+# Distance stored for people a landmark cannot reach. Distances are
+# unsigned 16-bit, so anything this far or further cannot be stored.
+UNREACHABLE = 65535
+
+
+class Landmarks():
+    """
+    Landmark people and, for each, an array of distances to every person.
+    """
+
+    def __init__(self, people, distances):
+        self.people = people
+        self.distances = distances
+
+    @classmethod
+    def load(cls, directory, graph, count=16):
+        """
+        Load the landmarks for the dataset in `directory`, or build and
+        save them if they are missing, stale, or built for a different
+        count.
+
+        `graph` must include the journalled updates. Landmarks saved before
+        some of them are repaired, and saved again.
+        """
+        path = os.path.join(directory, LANDMARKS)
+        sources = source_signature(directory, SOURCES)
+        updates = journal_size(directory)
+        snapshot = open_snapshot(path)
+        if (snapshot is not None
+                and snapshot.meta.get("sources") == sources
+                and snapshot.meta.get("people", math.inf) <= graph.num_people()
+                and snapshot.meta.get("updates", math.inf) <= updates
+                and snapshot.meta.get("count") == count):
+            people = snapshot["landmarks"]
+            flat = snapshot["distances"]
+            size = snapshot.meta["people"]
+            distances = [flat[i * size:(i + 1) * size]
+                         for i in range(len(people))]
+            landmarks = cls(people, distances)
+            if snapshot.meta["updates"] == updates:
+                return landmarks
+
+            # Catch up with the updates journalled since
+            for _ in range(size, graph.num_people()):
+                landmarks.add_person()
+            for kind, *fields in read_updates(directory,
+                                              snapshot.meta["updates"]):
+                if kind == "star" and len(fields) == 2:
+                    movie = graph.movie_index(fields[1])
+                    if movie is not None:
+                        landmarks.repair(graph, movie)
+        else:
+            landmarks = cls.build(graph, count)
+
+        try:
+            landmarks.save(path, {
+                "sources": sources,
+                "people": graph.num_people(),
+                "updates": updates,
+                # Asked for rather than found, which may be fewer
+                "count": count
+            })
+        except OSError:
+            pass
+        return landmarks
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Choose up to `count` landmarks and compute their distances.
+
+        Landmarks are taken in order of how many movies they starred in,
+        skipping anyone who shares a movie with a landmark already chosen,
+        so that they are spread across the graph.
+        """
+        candidates = sorted(
+            range(graph.num_people()),
+            key=lambda person: -len(graph.movies_of(person))
+        )
+        people = array("i")
+        distances = []
+        for person in candidates:
+            if len(people) == count:
+                break
+            if any(row[person] <= 1 for row in distances):
+                continue
+            people.append(person)
+            distances.append(distances_from(graph, person))
+        return cls(people, distances)
+
+    def save(self, path, meta):
+        flat = array("H")
+        for row in self.distances:
+            flat.extend(row)
+        write_snapshot(path, {
+            "landmarks": array("i", self.people),
+            "distances": flat
+        }, meta)
+
+    def add_person(self):
+        """
+        Extends the distances to a person just added to the graph, who
+        is not yet connected to anyone.
+        """
+        self.writable()
+        for row in self.distances:
+            row.append(UNREACHABLE)
+
+    def repair(self, graph, movie):
+        """
+        Updates the distances after a star was added to `movie`. Its stars
+        are now all within one of whichever of them is closest to each
+        landmark, and anyone that brings closer is searched onward from.
+        """
+        self.writable()
+        stars = graph.stars_of(movie)
+        for row in self.distances:
+            best = min(row[star] for star in stars)
+            if best >= UNREACHABLE - 1:
+                continue
+            depth = best + 1
+            layer = []
+            for star in stars:
+                if row[star] > depth:
+                    row[star] = depth
+                    layer.append(star)
+            expanded = {movie}
+            while layer:
+                depth += 1
+                following = []
+                for person in layer:
+                    for other in graph.movies_of(person):
+                        if other in expanded:
+                            continue
+                        expanded.add(other)
+                        for star in graph.stars_of(other):
+                            if row[star] > depth:
+                                row[star] = check_depth(depth)
+                                following.append(star)
+                layer = following
+
+    def writable(self):
+        """
+        Copies distances mapped from a snapshot, so they can be changed.
+        """
+        if not isinstance(self.people, array):
+            self.people = array("i", self.people)
+        self.distances = [row if isinstance(row, array) else array("H", row)
+                          for row in self.distances]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the separation of two people.
+        Both are math.inf if a landmark shows they are not connected.
+        """
+        if source == target:
+            return (0, 0)
+        lower = 0
+        upper = math.inf
+        for row in self.distances:
+            to_source = row[source]
+            to_target = row[target]
+            if to_source == UNREACHABLE or to_target == UNREACHABLE:
+                if to_source != to_target:
+                    return (math.inf, math.inf)
+                continue
+            lower = max(lower, abs(to_source - to_target))
+            upper = min(upper, to_source + to_target)
+        return (lower, upper)
+
+    def within(self, source, target, degrees):
+        """
+        Returns True if two people are known to be within `degrees` of
+        each other, False if they are known not to be, or None if the
+        bounds cannot tell.
+        """
+        lower, upper = self.bounds(source, target)
+        if upper <= degrees:
+            return True
+        if lower > degrees:
+            return False
+        return None
+
+    def path(self, graph, source, target, stats=None):
+        """
+        Returns the (movie, person) path from `source` to `target` through
+        the landmark giving their upper bound, or None if there is none.
+        It is a shortest path whenever that bound is the separation.
+        """
+        best = None
+        for row in self.distances:
+            if row[source] == UNREACHABLE or row[target] == UNREACHABLE:
+                continue
+            if best is None or (row[source] + row[target]
+                                < best[source] + best[target]):
+                best = row
+        if best is None:
+            return None
+
+        # Both people walk down the distances to the landmark, and the
+        # target's walk is turned around to lead away from it
+        forward = descend(graph, best, source, stats)
+        backward = descend(graph, best, target, stats)
+        people = [target] + [person for _, person in backward[:-1]]
+        return forward + [(movie, person) for (movie, _), person
+                          in reversed(list(zip(backward, people)))]
+
+
+def descend(graph, row, person, stats=None):
+    """
+    Returns the (movie, person) steps from `person` to the landmark whose
+    distances are `row`, each to a co-star one closer to it.
+    """
+    steps = []
+    while row[person]:
+        closer = row[person] - 1
+        if stats is not None:
+            stats["people_expanded"] += 1
+        for movie in graph.movies_of(person):
+            if stats is not None:
+                stats["movies_expanded"] += 1
+            following = next((star for star in graph.stars_of(movie)
+                              if row[star] == closer), None)
+            if following is not None:
+                break
+        steps.append((movie, following))
+        person = following
+    return steps
+
+
+def check_depth(depth):
+    """
+    Returns `depth` if it can be stored as a distance, and raises
+    ValueError otherwise.
+    """
+    if depth >= UNREACHABLE:
+        raise ValueError(f"distance {depth} is too far to store")
+    return depth
+
+
+def distances_from(graph, source):
+    """
+    Returns an array of every person's distance from `source`, by
+    breadth-first search expanding each movie only once.
+    """
+    distances = array("H", [UNREACHABLE]) * graph.num_people()
+    expanded = bytearray(graph.num_movies())
+    distances[source] = 0
+    layer = [source]
+    depth = 0
+    while layer:
+        depth += 1
+        following = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                for star in graph.stars_of(movie):
+                    if distances[star] == UNREACHABLE:
+                        distances[star] = check_depth(depth)
+                        following.append(star)
+        layer = following
+    return distances
+
+
+def alt_search(graph, landmarks, source, target, stats=None):
+    """
+    Returns the shortest list of (movie, person) integer pairs that
+    connect person `source` to person `target`, or None.
+
+    Works like graph.bidirectional_search, cut short by the landmark
+    bounds. Each layer with no meeting raises the lower bound, and once
+    it reaches the upper bound the path through the landmark is walked
+    instead of expanding the next, largest, layer. A meeting at the
+    lower bound is taken without finishing its layer.
+    """
+    if source == target:
+        return []
+    lower, upper = landmarks.bounds(source, target)
+    if lower == math.inf:
+        return None
+
+    parents = [{source: None}, {target: None}]
+    depths = [{source: 0}, {target: 0}]
+    expanded = [set(), set()]
+    frontiers = [[source], [target]]
+
+    # Depth of the last layer each side expanded
+    reached = [0, 0]
+
+    while frontiers[0] and frontiers[1]:
+        if lower >= upper:
+            return landmarks.path(graph, source, target, stats)
+
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen = parents[side]
+        depth_of = depths[side]
+        other_depth_of = depths[1 - side]
+        expanded_movies = expanded[side]
+
+        layer = []
+        meeting = None
+        for person in frontiers[side]:
+            if stats is not None:
+                stats["people_expanded"] += 1
+            depth = depth_of[person] + 1
+            for movie in graph.movies_of(person):
+                if movie in expanded_movies:
+                    continue
+                expanded_movies.add(movie)
+                if stats is not None:
+                    stats["movies_expanded"] += 1
+                for star in graph.stars_of(movie):
+                    if star in seen:
+                        continue
+                    seen[star] = (movie, person)
+                    depth_of[star] = depth
+                    layer.append(star)
+                    if star in other_depth_of:
+                        length = depth + other_depth_of[star]
+                        if length <= lower:
+                            return join_paths(star, parents[0], parents[1])
+                        if meeting is None or length < meeting[0]:
+                            meeting = (length, star)
+
+        if meeting is not None:
+            return join_paths(meeting[1], parents[0], parents[1])
+        frontiers[side] = layer
+
+        # Nobody within these depths of both people, so the path is longer
+        reached[side] += 1
+        lower = max(lower, reached[0] + reached[1] + 1)
+
+    return None
+
+
+def main():
+    import degrees
+
+    parser = argparse.ArgumentParser(description="Landmark degree bounds")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=16,
+                        help="number of landmarks")
+    parser.add_argument("--within", type=int, default=None,
+                        help="answer whether the two people are within "
+                             "this many degrees")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True)
+    degrees.load_landmarks(args.directory, args.count)
+    print("Data loaded.")
+
+    source = degrees.person_id_for_name(input("Name: "))
+    if source is None:
+        sys.exit("Person not found.")
+    target = degrees.person_id_for_name(input("Name: "))
+    if target is None:
+        sys.exit("Person not found.")
+
+    lower, upper = degrees.separation_bounds(source, target)
+    if lower == math.inf:
+        print("Not connected.")
+    elif upper == math.inf:
+        print(f"At least {lower} degrees of separation.")
+    else:
+        print(f"Between {lower} and {upper} degrees of separation.")
+    if args.within is not None:
+        within = degrees.within_degrees(source, target, args.within)
+        print(f"Within {args.within} degrees: {'yes' if within else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Name index for finding people by exact, prefix or approximate name.
+
+Exact and prefix lookups are binary searches over the people in order
+of their lowercased names. Approximate lookups go through an inverted
+index of the trigrams (three-letter substrings) of each name: the
+people who share the most trigrams with the query are the closest
+matches. All of it is held in flat arrays so it can be stored in a
+snapshot alongside the graph.
+
+People added after the index was built are kept in a small sorted list
+and trigram dict beside the arrays, and searched along with them.
+
+Data loaded without a Graph caches its index in a snapshot of its own.
+"""
+
+import os
+from array import array
+from bisect import bisect_left, insort
+from math import ceil
+
+from snapshot import StringTable, open_snapshot, source_signature
+from snapshot import write_snapshot
+
+# Share of the query's trigrams a name needs to be an approximate match
+MIN_OVERLAP = 0.5
+
+# Snapshot the index is cached in, next to the dataset, when it is loaded
+# without a Graph
+NAMES_SNAPSHOT = "names.snapshot"
+
+
+class NameIndex():
+    """
+    Lookups from names to the indices of people in `names`.
+
+    `ids` maps those indices to person ids, for callers that want them.
+    """
+
+    def __init__(self, names, ids, order, trigrams, trigram_offsets,
+                 trigram_people):
+        self.names = names
+        self.ids = ids
+        self.order = order
+        self.trigrams = trigrams
+        self.trigram_offsets = trigram_offsets
+        self.trigram_people = trigram_people
+
+        # People added since the arrays were built: (lowercased name,
+        # person) pairs in order, and trigram postings
+        self.added = []
+        self.added_postings = {}
+
+    @classmethod
+    def build(cls, names, ids):
+        """
+        Build the index for a sequence of names.
+        """
+        order = array("i", sorted(range(len(names)),
+                                  key=lambda i: names[i].lower()))
+
+        postings = {}
+        for i, name in enumerate(names):
+            for gram in trigrams_of(name):
+                postings.setdefault(gram, array("i")).append(i)
+
+        grams = sorted(postings)
+        offsets = array("q", [0])
+        people = array("i")
+        for gram in grams:
+            people.extend(postings[gram])
+            offsets.append(len(people))
+
+        return cls(names, ids, order, StringTable.from_strings(grams),
+                   offsets, people)
+
+    @classmethod
+    def load(cls, directory, names, ids, cache=True):
+        """
+        Load the index for the names of the people in `directory`, in the
+        order of its people.csv, from its snapshot if there is an
+        up-to-date one, and otherwise build it.
+
+        With `cache`, an index that had to be built is written back as a
+        snapshot for the next run.
+        """
+        path = os.path.join(directory, NAMES_SNAPSHOT)
+        meta = {
+            "sources": source_signature(directory, ["people.csv"]),
+            "people": len(names)
+        }
+        if cache:
+            snapshot = open_snapshot(path)
+            if (snapshot is not None and snapshot.meta == meta
+                    and all(name in snapshot for name in SECTIONS)):
+                return cls.from_snapshot(snapshot, names, ids)
+
+        index = cls.build(names, ids)
+        if cache:
+            try:
+                write_snapshot(path, index.sections(), meta)
+            except OSError:
+                # A read-only dataset directory just means no cache
+                pass
+        return index
+
+    @classmethod
+    def from_snapshot(cls, snapshot, names, ids):
+        return cls(names, ids, *(snapshot[name] for name in SECTIONS))
+
+    def sections(self):
+        """
+        Returns the arrays to store in a snapshot.
+        """
+        return {
+            "name_order": self.order,
+            "name_trigrams": self.trigrams,
+            "name_trigram_offsets": self.trigram_offsets,
+            "name_trigram_people": self.trigram_people
+        }
+
+    def add(self, person):
+        """
+        Adds a person to the index. Their name must already be in `names`.
+        """
+        name = self.names[person]
+        insort(self.added, (name.lower(), person))
+        for gram in trigrams_of(name):
+            self.added_postings.setdefault(gram, []).append(person)
+
+    def exact(self, name):
+        """
+        Returns the people whose name is `name`, ignoring case.
+        """
+        name = name.lower()
+        matches = []
+        for i in range(self.first_at_least(name), len(self.order)):
+            person = self.order[i]
+            if self.names[person].lower() != name:
+                break
+            matches.append(person)
+        for i in range(bisect_left(self.added, (name,)), len(self.added)):
+            if self.added[i][0] != name:
+                break
+            matches.append(self.added[i][1])
+        return matches
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` people whose name starts with `prefix`,
+        ignoring case, in alphabetical order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        for i in range(self.first_at_least(prefix), len(self.order)):
+            person = self.order[i]
+            if (len(matches) == limit
+                    or not self.names[person].lower().startswith(prefix)):
+                break
+            matches.append(person)
+        if not self.added:
+            return matches
+
+        # Merge in the added people, keeping alphabetical order
+        matches = [(self.names[person].lower(), person) for person in matches]
+        for i in range(bisect_left(self.added, (prefix,)), len(self.added)):
+            if not self.added[i][0].startswith(prefix):
+                break
+            matches.append(self.added[i])
+        matches.sort()
+        return [person for _, person in matches[:limit]]
+
+    def fuzzy(self, name, limit=10):
+        """
+        Returns up to `limit` (person, score) pairs for the people whose
+        names are most similar to `name`, best first. The score is the
+        Jaccard similarity of the two names' trigrams, between 0 and 1.
+        """
+        query = trigrams_of(name)
+        if not query:
+            return []
+
+        # A name sharing `needed` of the query's trigrams must contain one
+        # of any len(query) - needed + 1 of them, so it is enough to
+        # gather candidates from that many of the rarest ones
+        postings = sorted(
+            (self.postings(gram) for gram in query), key=len
+        )
+        needed = max(1, ceil(len(query) * MIN_OVERLAP))
+        candidates = set()
+        for people in postings[:len(query) - needed + 1]:
+            candidates.update(people)
+
+        scored = []
+        for person in candidates:
+            grams = trigrams_of(self.names[person])
+            shared = len(query & grams)
+            if shared >= needed:
+                score = shared / len(query | grams)
+                scored.append((-score, self.names[person], person))
+        scored.sort()
+        return [(person, -score) for score, _, person in scored[:limit]]
+
+    def search(self, name, limit=10):
+        """
+        Returns up to `limit` (person, score) candidates for `name`:
+        exact matches first, then prefix matches, then approximate ones.
+        """
+        results = [(person, 1.0) for person in self.exact(name)]
+        seen = {person for person, _ in results}
+        prefixed = [
+            (person, len(name) / len(self.names[person]))
+            for person in self.prefix(name, limit) if person not in seen
+        ]
+        prefixed.sort(key=lambda match: -match[1])
+        seen.update(person for person, _ in prefixed)
+        results.extend(prefixed)
+        for person, score in self.fuzzy(name, limit):
+            if person not in seen:
+                seen.add(person)
+                results.append((person, score))
+        return results[:limit]
+
+    def first_at_least(self, key):
+        """
+        Returns the position in self.order of the first lowercased name
+        that is not less than `key`.
+        """
+        return bisect_left(self.order, key,
+                           key=lambda person: self.names[person].lower())
+
+    def postings(self, gram):
+        """
+        Returns the people whose name contains a trigram.
+        """
+        i = bisect_left(self.trigrams, gram)
+        if i == len(self.trigrams) or self.trigrams[i] != gram:
+            people = ()
+        else:
+            people = self.trigram_people[
+                self.trigram_offsets[i]:self.trigram_offsets[i + 1]
+            ]
+        if gram in self.added_postings:
+            return list(people) + self.added_postings[gram]
+        return people
+
+
+# Snapshot sections of a NameIndex, in constructor order
+SECTIONS = (
+    "name_order", "name_trigrams", "name_trigram_offsets",
+    "name_trigram_people"
+)
+
+
+def trigrams_of(name):
+    """
+    Returns the set of trigrams of a lowercased name, padded so that the
+    start and end of each word count as well.
+    """
+    padded = "  " + " ".join(name.lower().split()) + " "
+    if padded.isspace():
+        return set()
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
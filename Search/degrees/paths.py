@@ -0,0 +1,267 @@
+"""
+Enumerating more than one connection between two people.
+
+all_shortest_paths builds the predecessor DAG of a breadth-first search
+once, trims it to the people who lie on some shortest path, and then
+walks it lazily, so that only one path is held at a time however many
+there are. k_shortest_paths goes on to longer connections, in order of
+length, using distances to the target to only ever follow steps that can
+still arrive in time.
+
+Paths are lists of (movie_id, person_id) pairs, as from shortest_path.
+Two paths through the same people but different movies are different.
+"""
+
+import argparse
+import sys
+from itertools import islice
+
+import degrees
+
+
+def shortest_path_dag(source, target):
+    """
+    Returns a dict mapping each person on a shortest path from `source` to
+    `target` (other than `source`) to the list of (movie_id, person_id)
+    steps that lead one person closer to `source` on such a path.
+
+    Returns None if the two are not connected.
+    """
+    if source == target:
+        return {}
+
+    # Breadth-first search from the source, one layer at a time, keeping
+    # every way into each person from the layer before
+    predecessors = {source: []}
+    layer = [source]
+    while layer and target not in predecessors:
+        following = {}
+        for person_id in layer:
+            for movie_id, neighbor_id in sorted(
+                degrees.neighbors_for_person(person_id)
+            ):
+                if neighbor_id in predecessors:
+                    continue
+                following.setdefault(neighbor_id, []).append(
+                    (movie_id, person_id)
+                )
+        predecessors.update(following)
+        layer = list(following)
+
+    if target not in predecessors:
+        return None
+
+    # Keep only the people the target can be traced back through
+    dag = {}
+    stack = [target]
+    while stack:
+        person_id = stack.pop()
+        if person_id in dag or person_id == source:
+            continue
+        dag[person_id] = predecessors[person_id]
+        stack.extend(parent_id for _, parent_id in predecessors[person_id])
+    return dag
+
+
+def count_paths(dag, source, target):
+    """
+    Returns the number of shortest paths in a shortest_path_dag, without
+    enumerating them.
+    """
+    counts = {source: 1}
+
+    def count(person_id):
+        # Iterative, so that long chains do not hit the recursion limit
+        if person_id in counts:
+            return counts[person_id]
+        stack = [person_id]
+        while stack:
+            current = stack[-1]
+            pending = [parent_id for _, parent_id in dag[current]
+                       if parent_id not in counts]
+            if pending:
+                stack.extend(pending)
+            else:
+                counts[current] = sum(
+                    counts[parent_id] for _, parent_id in dag[current]
+                )
+                stack.pop()
+        return counts[person_id]
+
+    return count(target)
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest path from `source` to `target`, one at a time.
+    Yields nothing if they are not connected.
+    """
+    dag = shortest_path_dag(source, target)
+    if dag is not None:
+        yield from dag_paths(dag, source, target)
+
+
+def dag_paths(dag, source, target):
+    """
+    Yields every path through a shortest_path_dag, one at a time.
+    """
+    if source == target:
+        yield []
+        return
+
+    # Depth-first walk back from the target. `steps` is the path so far,
+    # from the target backwards, and `choices` the untried steps at each
+    # point of it.
+    steps = []
+    choices = [iter(dag[target])]
+    while choices:
+        step = next(choices[-1], None)
+        if step is None:
+            choices.pop()
+            if steps:
+                steps.pop()
+            continue
+        steps.append(step)
+        if step[1] == source:
+            yield forward_path(target, steps)
+            steps.pop()
+        else:
+            choices.append(iter(dag[step[1]]))
+
+
+def forward_path(target, steps):
+    """
+    Turns steps walked back from `target`, each (movie_id, person_id) of
+    the person one closer to the source, into a path from the source.
+    """
+    people_on_path = [target] + [person_id for _, person_id in steps]
+    return [(movie_id, people_on_path[i])
+            for i, (movie_id, _) in reversed(list(enumerate(steps)))]
+
+
+def distances_to(target):
+    """
+    Returns a dict of every reachable person's distance from `target`.
+    """
+    distances = {target: 0}
+    layer = [target]
+    depth = 0
+    while layer:
+        depth += 1
+        following = []
+        for person_id in layer:
+            for _, neighbor_id in degrees.neighbors_for_person(person_id):
+                if neighbor_id not in distances:
+                    distances[neighbor_id] = depth
+                    following.append(neighbor_id)
+        layer = following
+    return distances
+
+
+def k_shortest_paths(source, target, k=None, max_length=None):
+    """
+    Yields up to `k` paths from `source` to `target` that visit nobody
+    twice, shortest first: all paths of one length before any longer one.
+    With `k` None, goes on until `max_length` (or until there are none
+    left, which on a large graph may take a very long time).
+    """
+    distances = distances_to(target)
+    if source not in distances:
+        return
+    if max_length is None:
+        max_length = len(distances) - 1
+
+    paths = (
+        path
+        for length in range(distances[source], max_length + 1)
+        for path in paths_of_length(source, target, length, distances)
+    )
+    yield from islice(paths, k)
+
+
+def paths_of_length(source, target, length, distances):
+    """
+    Yields the paths from `source` to `target` of exactly `length` steps
+    that visit nobody twice. Only steps to people who can still reach the
+    target in the steps that remain are taken.
+    """
+    if source == target:
+        if length == 0:
+            yield []
+        return
+
+    path = []
+    visited = {source}
+    choices = [iter(sorted(degrees.neighbors_for_person(source)))]
+    while choices:
+        step = next(choices[-1], None)
+        if step is None:
+            choices.pop()
+            if path:
+                visited.discard(path.pop()[1])
+            continue
+
+        movie_id, person_id = step
+        remaining = length - len(path) - 1
+        if (person_id in visited
+                or distances.get(person_id, remaining + 1) > remaining):
+            continue
+        if person_id == target:
+            if remaining == 0:
+                yield path + [step]
+            continue
+
+        path.append(step)
+        visited.add(person_id)
+        choices.append(iter(sorted(degrees.neighbors_for_person(person_id))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enumerate connections")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-k", type=int, default=None,
+                        help="list the k shortest paths, including longer "
+                             "ones, instead of all shortest paths")
+    parser.add_argument("--limit", type=int, default=20,
+                        help="most paths to print")
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact integer graph")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact)
+    print("Data loaded.")
+
+    source = degrees.person_id_for_name(input("Name: "))
+    if source is None:
+        sys.exit("Person not found.")
+    target = degrees.person_id_for_name(input("Name: "))
+    if target is None:
+        sys.exit("Person not found.")
+
+    if args.k is None:
+        dag = shortest_path_dag(source, target)
+        if dag is None:
+            sys.exit("Not connected.")
+        print(f"{count_paths(dag, source, target)} shortest paths.")
+        paths = dag_paths(dag, source, target)
+    else:
+        paths = k_shortest_paths(source, target, args.k)
+
+    found = False
+    for path in islice(paths, args.limit):
+        found = True
+        names = [degrees.people[source]["name"]] + [
+            degrees.people[person_id]["name"] for _, person_id in path
+        ]
+        titles = [degrees.movies[movie_id]["title"] for movie_id, _ in path]
+        steps = " -> ".join(
+            f"{name} ({title})" for name, title in zip(names, titles)
+        )
+        print(f"{len(path)}: {steps} -> {names[-1]}")
+    if not found:
+        print("Not connected.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Long-running query server for degrees.
+
+The data is loaded once, and requests are then answered over a local
+socket, one JSON object per line in each direction:
+
+    {"source": "Kevin Bacon", "target": "Tom Hanks"}
+    {"source": "102", "target": "158", "degrees": 1, "path": [...], ...}
+
+    {"command": "stats"}
+    {"queries": ..., "path_cache_hit_rate": ..., "latency_ms": {...}, ...}
+
+Searches run on a thread pool so that many connections can be served at
+once. Recent answers are kept in a bounded LRU cache, and so are whole
+breadth-first search trees for people who keep coming up as a source or
+target: once someone's tree is cached, any path to or from them is read
+straight off it.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+
+import degrees
+from batch import resolve
+
+
+class LRUCache():
+    """
+    Mapping of at most `capacity` entries that drops the least recently
+    used one when full, and counts its hits and misses.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class QueryServer():
+    """
+    Answers shortest path queries against the loaded data, with caches.
+
+    A person's search tree is built the second time they are part of a
+    query that misses both caches, so one-off queries never pay for a
+    full search.
+    """
+
+    def __init__(self, strategy=None, paths=10000, trees=4,
+                 latency_window=10000):
+        self.strategy = strategy
+        self.paths = LRUCache(paths)
+        self.trees = LRUCache(trees)
+        self.recent = LRUCache(paths)
+        self.building = {}
+        self.latencies = deque(maxlen=latency_window)
+        self.queries = 0
+
+    async def shortest_path(self, source, target):
+        """
+        Returns (path, how) for a query, where `how` says which cache or
+        search answered it.
+        """
+        key = (source, target)
+        path = self.paths.get(key)
+        if path is not None or key in self.paths:
+            return path, "path_cache"
+
+        loop = asyncio.get_running_loop()
+        path, how = self.from_trees(source, target)
+        if how is None:
+            path = await loop.run_in_executor(
+                None, degrees.shortest_path, source, target, self.strategy
+            )
+            how = "search"
+            for person_id in (source, target):
+                if person_id in self.recent:
+                    self.build_tree(person_id)
+                else:
+                    self.recent.put(person_id, True)
+
+        self.paths.put(key, path)
+        return path, how
+
+    def from_trees(self, source, target):
+        """
+        Returns (path, "tree_cache") if a cached search tree rooted at
+        either person answers the query, or (None, None).
+        """
+        for root, other in ((target, source), (source, target)):
+            if root in self.trees:
+                path = degrees.path_from_tree(self.trees.get(root), other)
+                if root == source and path is not None:
+                    path = degrees.reverse_path(target, path)
+                return path, "tree_cache"
+        self.trees.misses += 1
+        return None, None
+
+    def build_tree(self, person_id):
+        """
+        Starts building the search tree for a person in the background,
+        unless it is cached or already being built.
+        """
+        if person_id in self.trees or person_id in self.building:
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, degrees.search_tree, person_id)
+        self.building[person_id] = future
+
+        def done(future):
+            del self.building[person_id]
+            if future.exception() is None:
+                self.trees.put(person_id, future.result())
+
+        future.add_done_callback(done)
+
+    async def answer(self, request):
+        """
+        Returns the response dict for one request dict.
+        """
+        if request.get("command") == "stats":
+            return self.stats()
+
+        started = time.perf_counter()
+        source = resolve(str(request.get("source", "")))
+        target = resolve(str(request.get("target", "")))
+        if source is None or target is None:
+            return {"error": "person not found"}
+
+        path, how = await self.shortest_path(source, target)
+        latency = (time.perf_counter() - started) * 1000
+        self.latencies.append(latency)
+        self.queries += 1
+        return {
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path,
+            "answered_by": how,
+            "latency_ms": round(latency, 3)
+        }
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            "queries": self.queries,
+            "path_cache_hit_rate": self.paths.hit_rate(),
+            "path_cache_size": len(self.paths),
+            "tree_cache_hit_rate": self.trees.hit_rate(),
+            "tree_cache_size": len(self.trees),
+            "latency_ms": {
+                name: percentile(latencies, fraction)
+                for name, fraction in
+                (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+            }
+        }
+
+    async def handle(self, reader, writer):
+        """
+        Serves one connection until the client closes it.
+        """
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("expected a JSON object")
+                    response = await self.answer(request)
+                except ValueError as error:
+                    response = {"error": str(error)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def percentile(values, fraction):
+    """
+    Returns the given percentile of a sorted list, or None if it is empty.
+    """
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(fraction * len(values)))], 3)
+
+
+async def serve(query_server, socket=None, host="127.0.0.1", port=8765):
+    if socket is not None:
+        server = await asyncio.start_unix_server(query_server.handle, socket)
+    else:
+        server = await asyncio.start_server(query_server.handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Degrees query server")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--socket", help="serve on this Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--strategy", choices=sorted(degrees.STRATEGIES))
+    parser.add_argument("--compact", action="store_true",
+                        help="load the data into a compact integer graph")
+    parser.add_argument("--path-cache", type=int, default=10000,
+                        help="number of answers to keep")
+    parser.add_argument("--tree-cache", type=int, default=4,
+                        help="number of search trees to keep")
+    args = parser.parse_args()
+    if args.strategy in ("csr", "alt") and not args.compact:
+        parser.error(f"the {args.strategy} strategy needs --compact")
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact)
+    if args.strategy == "alt":
+        degrees.load_landmarks(args.directory)
+    print("Data loaded.")
+
+    query_server = QueryServer(args.strategy, args.path_cache, args.tree_cache)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"Serving on {where}")
+    try:
+        asyncio.run(serve(query_server, args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Binary snapshot files for the degrees data.
+
+A snapshot is a small JSON header followed by raw array sections. It is
+written once and then memory-mapped, so opening one costs almost nothing
+however large the arrays are: pages are only read in when touched.
+
+Layout:
+    MAGIC | header length (8 bytes, little endian) | header JSON | sections
+
+Each section starts on an 8-byte boundary. The header records, for each
+section, its array typecode, offset and length, plus any metadata the
+writer wants to keep alongside (such as the source files it was built
+from).
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections.abc import Sequence
+
+MAGIC = b"DEGSNAP1"
+ALIGNMENT = 8
+
+
+class StringTable(Sequence):
+    """
+    Sequence of strings stored as one UTF-8 blob plus an array of offsets,
+    so that it can live in a snapshot. Strings are decoded on access.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        return cls(bytes(data), offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def write_snapshot(path, sections, meta=None):
+    """
+    Writes `sections`, a dict of name -> array, bytes or StringTable (or
+    any sequence of strings), to a snapshot at `path`.
+
+    The file is written next to `path` and renamed into place, so a reader
+    never sees a half-written snapshot.
+    """
+    arrays = {}
+    for name, section in sections.items():
+        if isinstance(section, array):
+            arrays[name] = section
+        elif isinstance(section, (bytes, bytearray)):
+            arrays[name] = array("B", section)
+        else:
+            if not isinstance(section, StringTable):
+                section = StringTable.from_strings(section)
+            arrays[f"{name}.data"] = array("B", section.data)
+            arrays[f"{name}.offsets"] = array("q", section.offsets)
+
+    header = {
+        "byteorder": sys.byteorder,
+        "meta": meta or {},
+        "sections": {},
+        "strings": sorted(
+            name for name, section in sections.items()
+            if not isinstance(section, (array, bytes, bytearray))
+        )
+    }
+
+    # Lay the sections out after the header. The header size depends on
+    # the offsets, so place them relative to a padded header end.
+    offset = 0
+    for name, section in arrays.items():
+        header["sections"][name] = {
+            "type": section.typecode,
+            "offset": offset,
+            "length": len(section)
+        }
+        offset = align(offset + len(section) * section.itemsize)
+    encoded = json.dumps(header).encode("utf-8")
+    start = align(len(MAGIC) + 8 + len(encoded))
+
+    temporary = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for name, section in arrays.items():
+                f.seek(start + header["sections"][name]["offset"])
+                section.tofile(f)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class Snapshot():
+    """
+    A memory-mapped snapshot. Sections are returned as memoryviews of the
+    mapping, cast to their array typecode, or as StringTables.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a snapshot")
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length).decode("utf-8"))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(f"{path} was written on another platform")
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.path = path
+        self.meta = header["meta"]
+        self.sections = header["sections"]
+        self.strings = set(header["strings"])
+        self.start = align(len(MAGIC) + 8 + length)
+
+    def __contains__(self, name):
+        return name in self.sections or name in self.strings
+
+    def __getitem__(self, name):
+        if name in self.strings:
+            return StringTable(self[f"{name}.data"], self[f"{name}.offsets"])
+        section = self.sections[name]
+        itemsize = array(section["type"]).itemsize
+        begin = self.start + section["offset"]
+        end = begin + section["length"] * itemsize
+        return memoryview(self.map)[begin:end].cast(section["type"])
+
+
+def open_snapshot(path):
+    """
+    Returns the Snapshot at `path`, or None if there is no readable
+    snapshot there.
+    """
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def source_signature(directory, filenames):
+    """
+    Returns the size and modification time of each source file, to be
+    stored in a snapshot's metadata and compared on the next load.
+    """
+    signature = {}
+    for filename in filenames:
+        status = os.stat(os.path.join(directory, filename))
+        signature[filename] = [status.st_size, status.st_mtime_ns]
+    return signature
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
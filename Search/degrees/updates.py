@@ -0,0 +1,57 @@
+"""
+Journal of updates to a degrees dataset.
+
+New people, movies and stars are appended to updates.csv in the dataset
+directory instead of rewriting the large CSV files, and are replayed on
+top of them (or of the snapshot built from them) whenever the data is
+loaded. Each row is one of
+
+    person,<id>,<name>,<birth>
+    movie,<id>,<title>,<year>
+    star,<person_id>,<movie_id>
+
+Anything built from the data records the journal's size when it was
+built, so that it can replay just the rows added since.
+"""
+
+import csv
+import io
+import os
+
+UPDATES = "updates.csv"
+
+
+def journal_size(directory):
+    """
+    Returns the size in bytes of the journal in `directory` (0 if none).
+    """
+    try:
+        return os.path.getsize(os.path.join(directory, UPDATES))
+    except OSError:
+        return 0
+
+
+def read_updates(directory, offset=0):
+    """
+    Yields the rows of the journal in `directory`, each a list starting
+    with its kind, from byte `offset` on.
+    """
+    try:
+        f = open(os.path.join(directory, UPDATES), "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+        for row in csv.reader(text):
+            if row:
+                yield row
+
+
+def append_update(directory, *row):
+    """
+    Appends one row to the journal in `directory`.
+    """
+    with open(os.path.join(directory, UPDATES), "a",
+              encoding="utf-8", newline="") as f:
+        csv.writer(f).writerow(row)
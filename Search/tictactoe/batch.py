@@ -0,0 +1,136 @@
+"""
+Evaluates many Tic Tac Toe positions at once.
+
+Boards are written one per line, as rows separated by "/" with "-" for
+an empty cell, for example
+
+    X-O/-X-/--O
+
+Each is answered with its value with perfect play (or with a search
+`depth` moves deep, on large boards) and the best move, in the order
+given, or with an error if the line is not a board. The positions are
+spread over a pool of worker processes. Each worker keeps one
+transposition table for every board it is sent, so positions shared
+between boards are only searched once per worker.
+
+    python batch.py positions.txt --output values.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+import tictactoe as ttt
+
+
+def parseBoard(text):
+    """
+    Returns the board written as `text`.
+    """
+    board = []
+    for line in text.strip().split("/"):
+        row = []
+        for cell in line:
+            if cell in (ttt.X, ttt.O):
+                row.append(cell)
+            elif cell in "-.":
+                row.append(ttt.EMPTY)
+            else:
+                raise ValueError(f"Invalid cell {cell!r} in {text!r}")
+        board.append(tuple(row))
+    if any(len(row) != len(board[0]) for row in board):
+        raise ValueError(f"Rows of different lengths in {text!r}")
+    return tuple(board)
+
+
+def formatBoard(board):
+    """
+    Returns a board written as parseBoard reads it.
+    """
+    return "/".join("".join(cell or "-" for cell in row) for row in board)
+
+
+def readBoards(lines):
+    """
+    Yields the text of each board in an iterable of lines, skipping blank
+    ones. They are parsed where they are evaluated.
+    """
+    for line in lines:
+        if line.strip():
+            yield line.strip()
+
+
+def evaluatePosition(job):
+    """
+    Returns the result dict for a (board, depth) pair, the board given as
+    a board or as its text: the board, its value for X, and the best move
+    for the player to move (None once the game is over). A board that
+    does not parse gets an "error" instead.
+    """
+    board, depth = job
+    if isinstance(board, str):
+        try:
+            board = parseBoard(board)
+        except ValueError as e:
+            return {"board": board, "error": str(e)}
+    result = {"board": formatBoard(board)}
+    if ttt.terminal(board):
+        result["value"] = ttt.utility(board)
+        result["action"] = None
+    else:
+        found = ttt.search(board, depth)
+        result["value"] = found["value"]
+        result["action"] = found["action"]
+    return result
+
+
+def evaluateBoards(boards, depth=None, processes=None, chunk=64):
+    """
+    Yields the result dict for each board of an iterable, in order, as
+    soon as it is known. With `processes` 1 everything runs here, with
+    one transposition table for the whole batch.
+    """
+    jobs = ((board, depth) for board in boards)
+    if processes == 1:
+        for job in jobs:
+            yield evaluatePosition(job)
+        return
+
+    # Hand the boards over in chunks, so each worker's table is reused for
+    # many boards, a few chunks per worker at a time to keep the pool's
+    # queue short
+    window = chunk * (processes or os.cpu_count() or 1) * 4
+    with multiprocessing.Pool(processes) as pool:
+        pending = []
+        for job in jobs:
+            pending.append(job)
+            if len(pending) == window:
+                yield from pool.imap(evaluatePosition, pending, chunk)
+                pending = []
+        yield from pool.imap(evaluatePosition, pending, chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate positions")
+    parser.add_argument("path", nargs="?", default="-",
+                        help="file of boards, one per line (default: stdin)")
+    parser.add_argument("--output", default="-",
+                        help="file to write JSON lines to (default: stdout)")
+    parser.add_argument("--depth", type=int, default=None,
+                        help="moves to look ahead (default: to the end)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.path == "-" else open(args.path)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    with source, output:
+        for result in evaluateBoards(readBoards(source), args.depth,
+                                     args.processes):
+            output.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Tic Tac Toe on bitboards
+
+A position is a pair (x, o) of integers, with bit 3 * i + j set in x if
+X has played (i, j), and likewise for O. A move is a single OR, a win is
+a line mask that one side's bits cover, and the pair can be used as a
+dict key as it is. toBoard and fromBoard convert to and from the boards
+of tictactoe.py, so either can be used with runner.py.
+"""
+
+import tictactoe as ttt
+
+X = ttt.X
+O = ttt.O
+
+SIZE = 3
+
+# Every cell set
+FULL = (1 << SIZE * SIZE) - 1
+
+
+def lineMasks(size):
+    """
+    Returns the masks of the rows, columns and both diagonals of a board.
+    """
+    def mask(cells):
+        bits = 0
+        for i, j in cells:
+            bits |= 1 << (i * size + j)
+        return bits
+
+    lines = []
+    for k in range(size):
+        lines.append(mask((k, j) for j in range(size)))
+        lines.append(mask((i, k) for i in range(size)))
+    lines.append(mask((k, k) for k in range(size)))
+    lines.append(mask((k, size - 1 - k) for k in range(size)))
+    return lines
+
+LINES = lineMasks(SIZE)
+
+# Values of positions already solved, from X's point of view
+solved = {}
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return (0, 0)
+
+
+def fromBoard(board):
+    """
+    Returns the bitboard of a tictactoe.py board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (i * SIZE + j)
+            elif cell == O:
+                o |= 1 << (i * SIZE + j)
+    return (x, o)
+
+
+def toBoard(state):
+    """
+    Returns the tictactoe.py board of a bitboard.
+    """
+    x, o = state
+    board = []
+    for i in range(SIZE):
+        row = []
+        for j in range(SIZE):
+            bit = 1 << (i * SIZE + j)
+            row.append(X if x & bit else O if o & bit else ttt.EMPTY)
+        board.append(tuple(row))
+    return tuple(board)
+
+
+def player(state):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = state
+    return O if bin(x).count("1") > bin(o).count("1") else X
+
+
+def actions(state):
+    """
+    Returns the list of all possible actions (i, j) available on the board.
+    """
+    x, o = state
+    empty = FULL & ~(x | o)
+    return [divmod(cell, SIZE) for cell in range(SIZE * SIZE)
+            if empty >> cell & 1]
+
+
+def result(state, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    x, o = state
+    bit = 1 << (action[0] * SIZE + action[1])
+    if not 0 <= action[0] < SIZE or not 0 <= action[1] < SIZE or (x | o) & bit:
+        raise ValueError("Action not valid")
+    if player(state) == X:
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def hasLine(bits):
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+def winner(state):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = state
+    if hasLine(x):
+        return X
+    if hasLine(o):
+        return O
+    return None
+
+
+def terminal(state):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = state
+    return (x | o) == FULL or winner(state) is not None
+
+
+def utility(state):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    gameWinner = winner(state)
+    if gameWinner == X:
+        return 1
+    if gameWinner == O:
+        return -1
+    return 0
+
+
+def value(state):
+    """
+    Returns the value of a position with perfect play, from X's point of
+    view, solving and remembering it if it is not known yet.
+    """
+    if state in solved:
+        return solved[state]
+    if terminal(state):
+        best = utility(state)
+    elif player(state) == X:
+        best = max(value(result(state, action)) for action in actions(state))
+    else:
+        best = min(value(result(state, action)) for action in actions(state))
+    solved[state] = best
+    return best
+
+
+def minimax(state):
+    """
+    Returns the optimal action for the current player on the board, which
+    may be a bitboard or a tictactoe.py board.
+    """
+    if not isinstance(state[0], int):
+        state = fromBoard(state)
+    if terminal(state):
+        return None
+    choose = max if player(state) == X else min
+    return choose(actions(state),
+                  key=lambda action: value(result(state, action)))
@@ -0,0 +1,64 @@
+"""
+Builds the opening book for 3x3 Tic Tac Toe.
+
+Every position that can come up in a game is solved once, and the best
+move of each is written to a file that minimax then answers from without
+searching. Positions that are rotations or reflections of each other
+share a line.
+
+    python book.py
+"""
+
+import argparse
+
+import tictactoe as ttt
+
+
+def reachablePositions(board):
+    """
+    Returns one board for each canonical position reachable from `board`
+    that is not over yet, by canonical key.
+    """
+    positions = {}
+    stack = [board]
+    while stack:
+        board = stack.pop()
+        if ttt.terminal(board):
+            continue
+        key, _ = ttt.canonicalForm(board)
+        if key in positions:
+            continue
+        positions[key] = board
+        for action in ttt.actions(board):
+            stack.append(ttt.result(board, action))
+    return positions
+
+
+def buildBook(path=ttt.BOOK):
+    """
+    Solves every reachable 3x3 position and writes the book to `path`.
+    Returns the number of positions written.
+    """
+    lines = []
+    for key, board in reachablePositions(ttt.initial_state()).items():
+        i, j = ttt.search(board)["action"]
+        _, symmetry = ttt.canonicalForm(board)
+        row, col = ttt.SYMMETRIES[(3, 3)][symmetry][i * 3 + j]
+        lines.append(f"{key} {row} {col}\n")
+
+    with open(path, "w") as f:
+        f.writelines(sorted(lines))
+    return len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the opening book")
+    parser.add_argument("path", nargs="?", default=ttt.BOOK)
+    args = parser.parse_args()
+
+    count = buildBook(args.path)
+    print(f"Wrote {count} positions to {args.path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Monte Carlo Tree Search player for Tic Tac Toe, on boards of any size.
+
+UCT: each playout walks down the tree picking the child with the best
+upper confidence bound, adds one new position, finishes the game with a
+rollout (random moves, or heuristic ones that take wins and block
+losses), and credits the result to every position on the way. The move
+played is the one tried most.
+
+The search is anytime. It stops when its time or playout budget is
+spent, or as soon as the caller cancels it, and answers with what it has
+found so far. With several processes, each grows its own tree and the
+counts for the moves at the root are added up.
+
+    python mcts.py --rows 7 --cols 7 --time 2 --processes 4
+"""
+
+import argparse
+import math
+import multiprocessing
+import random
+import time
+
+import tictactoe as ttt
+
+# Weight of exploring little-tried moves against exploiting good ones
+EXPLORATION = math.sqrt(2)
+
+# Set in worker processes when the search they are part of is cancelled
+stopped = None
+
+
+class Node():
+    """
+    A position in the search tree, with the number of playouts through it
+    and the total reward they earned the player who moved into it.
+    """
+
+    def __init__(self, board, parent=None, action=None):
+        self.board = board
+        self.parent = parent
+        self.action = action
+        self.children = []
+        self.untried = None if ttt.terminal(board) else list(ttt.actions(board))
+        self.visits = 0
+        self.reward = 0
+
+    def bestChild(self, exploration):
+        logVisits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: (child.reward / child.visits + exploration
+                               * math.sqrt(logVisits / child.visits))
+        )
+
+    def expand(self, rng):
+        action = self.untried.pop(rng.randrange(len(self.untried)))
+        child = Node(ttt.result(self.board, action), self, action)
+        self.children.append(child)
+        return child
+
+
+def randomRollout(board, rng):
+    """
+    Returns the utility of a game finished with random moves.
+    """
+    while not ttt.terminal(board):
+        board = ttt.result(board, rng.choice(list(ttt.actions(board))))
+    return ttt.utility(board)
+
+
+def heuristicRollout(board, rng):
+    """
+    Returns the utility of a game finished with moves that win if they can,
+    block the opponent's win if they must, and are random otherwise.
+    """
+    while not ttt.terminal(board):
+        me = ttt.player(board)
+        opponent = ttt.O if me == ttt.X else ttt.X
+        moves = list(ttt.actions(board))
+        move = next((action for action in moves
+                     if ttt.completesLine(board, action, me)), None)
+        if move is None:
+            move = next((action for action in moves
+                         if ttt.completesLine(board, action, opponent)), None)
+        if move is None:
+            move = rng.choice(moves)
+        board = ttt.result(board, move)
+    return ttt.utility(board)
+
+
+ROLLOUTS = {
+    "heuristic": heuristicRollout,
+    "random": randomRollout
+}
+
+
+def grow(board, timeLimit=None, playouts=None, rollout="random", seed=None,
+         exploration=EXPLORATION, cancel=None):
+    """
+    Runs playouts from `board` until `timeLimit` seconds or `playouts` are
+    used up, or `cancel` (anything with an is_set method) is set. Returns
+    a dict of (visits, reward) by action at the root, the reward being
+    the mover's.
+    """
+    rng = random.Random(seed)
+    finish = ROLLOUTS[rollout]
+    deadline = None if timeLimit is None else time.monotonic() + timeLimit
+    root = Node(board)
+    count = 0
+
+    while playouts is None or count < playouts:
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        if cancel is not None and cancel.is_set():
+            break
+        count += 1
+
+        # Selection: follow the best bounds down to a position with
+        # untried moves, or to the end of the game
+        node = root
+        while not node.untried and node.children:
+            node = node.bestChild(exploration)
+
+        # Expansion
+        if node.untried:
+            node = node.expand(rng)
+
+        # Simulation
+        value = finish(node.board, rng)
+
+        # Backpropagation, each node scored for the player who moved into it
+        while node.parent is not None:
+            node.visits += 1
+            # 1 for a win, 0.5 for a draw and 0 for a loss
+            mover = ttt.player(node.parent.board)
+            score = value if mover == ttt.X else -value
+            node.reward += (score + 1) / 2
+            node = node.parent
+        node.visits += 1
+
+    return {child.action: (child.visits, child.reward)
+            for child in root.children}
+
+
+def growInWorker(job):
+    board, timeLimit, playouts, rollout, seed, exploration = job
+    return grow(board, timeLimit, playouts, rollout, seed, exploration,
+                stopped)
+
+
+def startWorker(event):
+    global stopped
+    stopped = event
+
+
+def mcts(board, timeLimit=1.0, playouts=None, processes=1,
+         rollout="random", seed=None, exploration=EXPLORATION, cancel=None):
+    """
+    Returns the best action for the current player on the board found
+    within `timeLimit` seconds and `playouts` playouts (each per process;
+    None for no limit), or before `cancel` is set. Returns None if the game
+    is over.
+    """
+    if ttt.terminal(board):
+        return None
+    if timeLimit is None and playouts is None and cancel is None:
+        raise ValueError("mcts needs a time limit, playout limit or cancel")
+
+    if processes == 1:
+        counts = grow(board, timeLimit, playouts, rollout, seed,
+                      exploration, cancel)
+    else:
+        counts = {}
+        base = random.Random(seed).randrange(2 ** 32)
+        jobs = [(board, timeLimit, playouts, rollout, base + i, exploration)
+                for i in range(processes)]
+        event = multiprocessing.Event()
+        with multiprocessing.Pool(processes, startWorker, (event,)) as pool:
+            pending = pool.map_async(growInWorker, jobs)
+            while not pending.ready():
+                if cancel is not None and cancel.is_set():
+                    event.set()
+                pending.wait(0.01)
+            for tree in pending.get():
+                for action, (visits, reward) in tree.items():
+                    total = counts.get(action, (0, 0))
+                    counts[action] = (total[0] + visits, total[1] + reward)
+
+    if not counts:
+        # Cancelled before a single playout; any move will do
+        return next(iter(ttt.orderedActions(board)))
+    return max(counts, key=lambda action: counts[action])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MCTS Tic Tac Toe")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("--time", type=float, default=1.0,
+                        help="seconds per move")
+    parser.add_argument("--playouts", type=int, default=None,
+                        help="most playouts per move and process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--rollout", choices=sorted(ROLLOUTS),
+                        default="heuristic")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    # Self-play, printing the board after every move
+    board = ttt.initial_state(args.rows, args.cols)
+    while not ttt.terminal(board):
+        action = mcts(board, args.time, args.playouts, args.processes,
+                      args.rollout, args.seed)
+        board = ttt.result(board, action)
+        print("\n".join("".join(cell or "." for cell in row)
+                        for row in board))
+        print()
+    winner = ttt.winner(board)
+    print(f"Game Over: {winner} wins." if winner else "Game Over: Tie.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,60 @@
 import pygame
+import queue
 import sys
+import threading
 import time
 
 import tictactoe as ttt
 
+
+class AIWorker():
+    """
+    Runs the AI on a background thread, so the window keeps drawing while
+    it thinks. Results come back through a queue. The function run is
+    passed a `cancel` event, set when the search is cancelled so that it
+    can stop early; whatever it returns then is thrown away.
+    """
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self.search = 0
+        self.busy = False
+        self.cancelled = threading.Event()
+
+    def start(self, function, *args):
+        self.search += 1
+        self.busy = True
+        search = self.search
+        self.cancelled = cancel = threading.Event()
+        threading.Thread(
+            target=lambda: self.results.put(
+                (search, function(*args, cancel=cancel))
+            ),
+            daemon=True
+        ).start()
+
+    def cancel(self):
+        self.search += 1
+        self.busy = False
+        self.cancelled.set()
+
+    def result(self):
+        """
+        Returns (True, result) once the current search is done, otherwise
+        (False, None).
+        """
+        while not self.results.empty():
+            search, value = self.results.get()
+            if search == self.search:
+                self.busy = False
+                return True, value
+        return False, None
+
+
 pygame.init()
 size = width, height = 600, 400
+FPS = 30
+clock = pygame.time.Clock()
 
 # Colors
 black = (0, 0, 0)
@@ -19,7 +68,7 @@ moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+worker = AIWorker()
 
 while True:
 
@@ -102,21 +151,38 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (int(time.time() * 2) % 3 + 1)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searching in the background
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+            if not worker.busy:
+                worker.start(ttt.minimax, board)
             else:
-                ai_turn = True
+                done, move = worker.result()
+                if done:
+                    board = ttt.result(board, move)
+
+        # Let the user give up on a search in progress
+        if worker.busy:
+            cancelButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+            cancel = mediumFont.render("Cancel", True, black)
+            cancelRect = cancel.get_rect()
+            cancelRect.center = cancelButton.center
+            pygame.draw.rect(screen, white, cancelButton)
+            screen.blit(cancel, cancelRect)
+            click, _, _ = pygame.mouse.get_pressed()
+            if click == 1:
+                mouse = pygame.mouse.get_pos()
+                if cancelButton.collidepoint(mouse):
+                    time.sleep(0.2)
+                    worker.cancel()
+                    user = None
+                    board = ttt.initial_state()
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +207,6 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+    clock.tick(FPS)
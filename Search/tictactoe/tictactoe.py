@@ -1,22 +1,79 @@
 """
 Tic Tac Toe Player
+
+Boards can be any number of rows and columns, won by getting winLength
+marks in a row. 3x3 boards are searched to the end. Larger ones are
+searched by iterative deepening, scoring the positions where the search
+stops with evaluate, until the time for the move runs out.
+
+Boards are tuples of row tuples, so they are hashable, and result builds
+a new one sharing every row but the one played in. Functions that read
+boards also accept lists of lists.
 """
 
 import math
-import copy
+import os
+import time
+from collections import OrderedDict
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Marks in a row needed to win, or None for the board's smaller side
+# (but no more than 5)
+WIN_LENGTH = None
+
+# Seconds minimax may spend on a move when it cannot search to the end
+TIME_LIMIT = 1.0
+
+# Largest number of cells minimax searches to the end by default
+FULL_SEARCH_CELLS = 9
+
+# Opening book of perfect moves for every 3x3 position, written by book.py
+BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.txt")
+
+# Book moves by canonical key, once read; empty if there is no book
+book = None
+
+# Most positions the transposition table keeps before evicting the least
+# recently used one
+TABLE_SIZE = 100000
+
+# Search results by canonical board: the value, the best move in the
+# canonical board's coordinates, and whether the value is exact or only a
+# bound (when alpha-beta cut the search short)
+transpositions = OrderedDict()
 
-def initial_state():
+# Kinds of value kept in the transposition table
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
+
+
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return ((EMPTY,) * cols,) * rows
+
+
+def frozenBoard(board):
+    """
+    Returns a board as a tuple of row tuples, such as a list board.
+    """
+    if isinstance(board, tuple) and all(isinstance(row, tuple) for row in board):
+        return board
+    return tuple(tuple(row) for row in board)
+
+
+def winLength(board):
+    """
+    Returns how many marks in a row win on a board.
+    """
+    if WIN_LENGTH is not None:
+        return WIN_LENGTH
+    return min(len(board), len(board[0]), 5)
 
 
 def player(board):
@@ -51,19 +108,13 @@ def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    try:
-        copyBoard = copy.deepcopy(board)
-        
-        if copyBoard[action[0]][action[1]] is not EMPTY:
-            raise NameError("Action not valid")
-        if action[0] > len(copyBoard) or action[1] > len(copyBoard[0]) or action[0] < 0 or action[1] < 0:
-            raise NameError("Action not valid")
-        
-        copyBoard[action[0]][action[1]] = player(copyBoard);
-        
-        return copyBoard
-    except:
-        raise NameError("Action not valid")
+    i, j = action
+    if not (0 <= i < len(board) and 0 <= j < len(board[0])) or board[i][j] is not EMPTY:
+        raise ValueError("Action not valid")
+
+    board = frozenBoard(board)
+    row = board[i]
+    return board[:i] + (row[:j] + (player(board),) + row[j + 1:],) + board[i + 1:]
 
 
 def winner(board):
@@ -81,42 +132,53 @@ def winner(board):
     return winner
 
 def checkHorizontaly(board, player):
+    k = winLength(board)
     for row in board:
-        if row.count(player) == 3:
-            return True;
+        if hasRun(row, player, k):
+            return True
+    return False
     
 def checkVerticaly(board, player):
-    for col in range(3):      
-        count = 0;   
-        for row in range(3):
-            if board[row][col] is player:
-                count += 1            
-            if count == 3: return True
+    k = winLength(board)
+    for col in range(len(board[0])):
+        if hasRun([row[col] for row in board], player, k):
+            return True
         
     return False
 
 def checkDiagonally(board, player):
-    colIndex = 0
-    count = 0
-    for row in board:
-        if row[colIndex] is player:
-            count += 1
-        if count == 3:
-            return True        
-        colIndex += 1 
+    k = winLength(board)
+    rows, cols = len(board), len(board[0])
 
-    colIndex = len(board) - 1;
-    count = 0
+    # Diagonals going down to the right, then down to the left, from
+    # every cell on the top row or the side they start from
+    starts = [(0, col) for col in range(cols)] + [(row, 0) for row in range(1, rows)]
+    for rowIdx, colIdx in starts:
+        cells = [board[rowIdx + d][colIdx + d]
+                 for d in range(min(rows - rowIdx, cols - colIdx))]
+        if hasRun(cells, player, k):
+            return True
 
-    for row in board:
-        if row[colIndex] is player:
-            count += 1
-        if count == 3:
-            return True        
-        colIndex -= 1 
+    starts = [(0, col) for col in range(cols)] + [(row, cols - 1) for row in range(1, rows)]
+    for rowIdx, colIdx in starts:
+        cells = [board[rowIdx + d][colIdx - d]
+                 for d in range(min(rows - rowIdx, colIdx + 1))]
+        if hasRun(cells, player, k):
+            return True
     
     return False
 
+def hasRun(cells, player, k):
+    """
+    Returns True if `cells` has k of player's marks in a row.
+    """
+    count = 0
+    for cell in cells:
+        count = count + 1 if cell is player else 0
+        if count == k:
+            return True
+    return False
+
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
@@ -148,26 +210,218 @@ def utility(board):
     return 0
 
 
-def minimax(board):
+def minimax(board, stats=None, timeLimit=None, callback=None,
+            profiler=None, cancel=None):
     """
     Returns the optimal action for the current player on the board.
+
+    Boards of more than FULL_SEARCH_CELLS cells, or any board when
+    `timeLimit` is given, are searched by iterative deepening for at most
+    `timeLimit` (or TIME_LIMIT) seconds, and the action returned is the best
+    one found by the deepest search that finished.
+
+    `stats` may be a SearchStats, which counts the work done by every call
+    it is passed to, or a dict, to which the same counts are added.
+    `callback` is called with a SearchStats of this move alone after each
+    iteration of iterative deepening and when the move is chosen.
+    `profiler`, such as a cProfile.Profile, is enabled for the call.
+    If `cancel` (anything with an is_set method, such as a
+    threading.Event) is set, the search stops as soon as it can and
+    returns None.
     """
     if terminal(board): return None
-    
+    if stats is not None or callback is not None:
+        searchStats = SearchStats()
+    else:
+        searchStats = None
+
+    if profiler is not None:
+        profiler.enable()
+    started = time.perf_counter()
+    try:
+        move = chooseMove(board, searchStats, timeLimit, callback, cancel)
+    except SearchTimeout:
+        if cancel is None or not cancel.is_set():
+            raise
+        move = None
+    finally:
+        if profiler is not None:
+            profiler.disable()
+
+    if searchStats is not None:
+        searchStats.moves += 1
+        searchStats.seconds += time.perf_counter() - started
+        if stats is not None:
+            searchStats.addTo(stats)
+        if callback is not None:
+            callback(searchStats)
+    return move
+
+def chooseMove(board, stats, timeLimit, callback, cancel):
+    if stats is not None:
+        stats.depth = None
+    if timeLimit is None:
+        move = bookMove(board)
+        if move is not None:
+            if stats is not None:
+                stats.bookMoves += 1
+            return move
+    if timeLimit is None and len(board) * len(board[0]) <= FULL_SEARCH_CELLS:
+        return search(board, stats=stats, cancel=cancel)["action"]
+    move = iterativeDeepening(board, timeLimit or TIME_LIMIT, stats, callback,
+                              cancel)
+    if cancel is not None and cancel.is_set():
+        return None
+    return move
+
+class SearchStats():
+    """
+    Counts of the work minimax did: moves chosen, and for all of them
+    together the positions searched, transposition table hits, alpha-beta
+    cutoffs, moves answered from the book and seconds taken, the most
+    moves ahead any search looked, and how deep the last iterative
+    deepening got (None if it searched to the end).
+    """
+
+    def __init__(self):
+        self.moves = 0
+        self.nodes = 0
+        self.cacheHits = 0
+        self.cutoffs = 0
+        self.bookMoves = 0
+        self.seconds = 0.0
+        self.maxDepth = 0
+        self.depth = None
+
+    def __repr__(self):
+        counts = ", ".join(f"{name}={value!r}" for name, value in vars(self).items())
+        return f"SearchStats({counts})"
+
+    def addTo(self, counts):
+        """
+        Adds these counts to a dict of them, or to another SearchStats.
+        """
+        if isinstance(counts, SearchStats):
+            counts = vars(counts)
+        for name, value in vars(self).items():
+            if name == "maxDepth":
+                counts[name] = max(counts.get(name, 0), value)
+            elif name == "depth":
+                counts[name] = value
+            else:
+                counts[name] = counts.get(name, 0) + value
+
+def search(board, depth=None, deadline=None, stats=None, cancel=None):
+    """
+    Returns {"value", "action"} for the player to move, looking `depth`
+    moves ahead (or to the end, if None). Raises SearchTimeout once
+    `deadline` has passed or `cancel` is set.
+    """
     if player(board) is X:
-        return maxVal(board)["action"]
+        return maxVal(board, stats=stats, depth=depth, deadline=deadline,
+                      cancel=cancel)
     else:
-        return minVal(board)["action"]
-        
-def maxVal(board):
+        return minVal(board, stats=stats, depth=depth, deadline=deadline,
+                      cancel=cancel)
+
+def iterativeDeepening(board, timeLimit, stats=None, callback=None,
+                       cancel=None):
+    """
+    Returns the best action found by searching one move ahead, then two,
+    and so on until `timeLimit` seconds have passed, `cancel` is set or the
+    result is known.
+    Each search starts from the best moves of the one before, through the
+    transposition table.
+    """
+    deadline = time.monotonic() + timeLimit
+    bestMove = orderedActions(board, depth=1)[0]
+    remaining = sum(row.count(EMPTY) for row in board)
+    for depth in range(1, remaining + 1):
+        try:
+            found = search(board, depth, deadline, stats, cancel)
+        except SearchTimeout:
+            break
+        bestMove = found["action"]
+        if stats is not None:
+            stats.depth = depth
+            if callback is not None:
+                callback(stats)
+        # A forced win or loss is as deep as the search needs to go
+        if found["value"] in (1, -1):
+            break
+    return bestMove
+
+def bookMove(board):
+    """
+    Returns the opening book's move for a board, or None if it has none.
+    """
+    global book
+    if book is None:
+        book = readBook(BOOK)
+    if not book:
+        return None
+    key, symmetry = canonicalForm(board)
+    if key not in book:
+        return None
+    moves = SYMMETRIES[(len(board), len(board[0]))][symmetry]
+    return divmod(moves.index(book[key]), len(board[0]))
+
+def readBook(path):
+    """
+    Returns the moves in an opening book file, by canonical key. Each line
+    of the file is a key, then the row and column of the move on the
+    board the key describes. Returns {} if there is no such file.
+    """
+    moves = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, i, j = line.split()
+                moves[key] = (int(i), int(j))
+    except FileNotFoundError:
+        pass
+    return moves
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search whose time has run out, or that was cancelled.
+    """
+
+def maxVal(board, alpha=-math.inf, beta=math.inf, stats=None, depth=None,
+           deadline=None, ply=0, cancel=None):
+    """
+    Returns {"value", "action"} for X to move, searching only as far as is
+    needed to tell whether the value lies between alpha and beta, and no
+    more than `depth` moves ahead (if not None).
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.maxDepth = max(stats.maxDepth, ply)
     if terminal(board):
         return { "value": utility(board) }
+    if depth == 0:
+        return { "value": evaluate(board) }
+    if deadline is not None and time.monotonic() > deadline:
+        raise SearchTimeout()
+    if cancel is not None and cancel.is_set():
+        raise SearchTimeout()
+
+    key, symmetry = canonicalForm(board)
+    cached = lookupTransposition(key, symmetry, board)
+    if usable(cached, alpha, beta, depth):
+        if stats is not None:
+            stats.cacheHits += 1
+        return cached
     
     currVal = -(math.inf)
+    lowest = alpha
+    following = None if depth is None else depth - 1
     
     bestMove = None
-    for action in actions(board):
-        minValue = minVal(result(board, action))
+    hint = cached["action"] if cached is not None else None
+    for action in orderedActions(board, hint, depth):
+        minValue = minVal(result(board, action), alpha, beta, stats,
+                          following, deadline, ply + 1, cancel)
         '''
             Not using "max" because we need to store the best action when
             the new value is bigger than the currently stored (Better move)
@@ -177,20 +431,53 @@ def maxVal(board):
             bestMove = action
             # If the new value is the max score, return directly so its faster
             if currVal == 1:
-                return { "value": currVal, "action": action }
+                break
+            alpha = max(alpha, currVal)
+            # Min will never let the game get here, so stop looking
+            if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                break
     
-    # If it hasnt returned anything, return the current better move
+    bound = boundOf(currVal, lowest, beta)
+    storeTransposition(key, symmetry, board, currVal, bestMove, bound, depth)
     return { "value": currVal, "action": bestMove }
 
-def minVal(board):
+def minVal(board, alpha=-math.inf, beta=math.inf, stats=None, depth=None,
+           deadline=None, ply=0, cancel=None):
+    """
+    Returns {"value", "action"} for O to move, searching only as far as is
+    needed to tell whether the value lies between alpha and beta, and no
+    more than `depth` moves ahead (if not None).
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.maxDepth = max(stats.maxDepth, ply)
     if terminal(board):
         return { "value": utility(board) }
+    if depth == 0:
+        return { "value": evaluate(board) }
+    if deadline is not None and time.monotonic() > deadline:
+        raise SearchTimeout()
+    if cancel is not None and cancel.is_set():
+        raise SearchTimeout()
+
+    key, symmetry = canonicalForm(board)
+    cached = lookupTransposition(key, symmetry, board)
+    if usable(cached, alpha, beta, depth):
+        if stats is not None:
+            stats.cacheHits += 1
+        return cached
     
     currVal = math.inf
+    highest = beta
+    following = None if depth is None else depth - 1
     
     bestMove = None
-    for action in actions(board):
-        maxValue = maxVal(result(board, action))
+    hint = cached["action"] if cached is not None else None
+    for action in orderedActions(board, hint, depth):
+        maxValue = maxVal(result(board, action), alpha, beta, stats,
+                          following, deadline, ply + 1, cancel)
         '''
             Not using "min" because we need to store the best action when
             the new value is lower than the currently stored (Better move)
@@ -200,7 +487,226 @@ def minVal(board):
             bestMove = action
             # If the new value is the min score, return directly so its faster
             if currVal == -1:
-                return { "value": currVal, "action": action }
+                break
+            beta = min(beta, currVal)
+            # Max will never let the game get here, so stop looking
+            if alpha >= beta:
+                if stats is not None:
+                    stats.cutoffs += 1
+                break
     
-    # If it hasnt returned anything, return the current better move
-    return { "value": currVal, "action": bestMove }
\ No newline at end of file
+    bound = boundOf(currVal, alpha, highest)
+    storeTransposition(key, symmetry, board, currVal, bestMove, bound, depth)
+    return { "value": currVal, "action": bestMove }
+
+def usable(cached, alpha, beta, depth):
+    """
+    Returns True if a transposition table entry answers a search with the
+    window (alpha, beta) to `depth`.
+    """
+    if cached is None:
+        return False
+    # A win or loss is known however it was found
+    deepEnough = (cached["depth"] is None or cached["value"] in (1, -1)
+                  or depth is not None and cached["depth"] >= depth)
+    return deepEnough and (
+        cached["bound"] == EXACT
+        or cached["bound"] == LOWER and cached["value"] >= beta
+        or cached["bound"] == UPPER and cached["value"] <= alpha
+    )
+
+def boundOf(value, alpha, beta):
+    """
+    Returns what a value found with the window (alpha, beta) tells: a
+    value of 1 or -1 is always exact, since nothing is better or worse.
+    """
+    if value in (1, -1) or alpha < value < beta:
+        return EXACT
+    if value >= beta:
+        return LOWER
+    return UPPER
+
+def evaluate(board):
+    """
+    Returns an estimate between -1 and 1 (exclusive) of how good a board is
+    for X: every stretch of winLength cells that only one player has marks
+    in counts for them, more the more marks it has.
+    """
+    k = winLength(board)
+    score = 0
+    for line in boardLines(board):
+        if line.count("-") == len(line):
+            continue
+        for start in range(len(line) - k + 1):
+            window = line[start:start + k]
+            xCount = window.count(X)
+            oCount = window.count(O)
+            if oCount == 0:
+                score += xCount * xCount
+            elif xCount == 0:
+                score -= oCount * oCount
+    return score / (abs(score) + 100)
+
+def boardLines(board):
+    """
+    Returns the rows, columns and diagonals of a board at least winLength
+    long, as strings with "-" for empty cells.
+    """
+    k = winLength(board)
+    rows, cols = len(board), len(board[0])
+    cells = [[cell or "-" for cell in row] for row in board]
+    lines = ["".join(row) for row in cells]
+    lines += ["".join(cells[i][j] for i in range(rows)) for j in range(cols)]
+    for diagonal in range(-(rows - k), cols - k + 1):
+        lines.append("".join(cells[i][i + diagonal] for i in range(rows)
+                             if 0 <= i + diagonal < cols))
+        lines.append("".join(cells[i][cols - 1 - i - diagonal]
+                             for i in range(rows)
+                             if 0 <= cols - 1 - i - diagonal < cols))
+    return lines
+
+def orderedActions(board, first=None, depth=None):
+    """
+    Returns the actions on a board, most promising first: `first` (such as
+    the best move from an earlier search), then moves that win, moves that
+    block the opponent from winning, the centre, corners, and the rest.
+
+    In a search limited to `depth` on a board larger than
+    FULL_SEARCH_CELLS, only cells next to a mark (or the centre, on an
+    empty board) are worth trying.
+    """
+    me = player(board)
+    opponent = O if me is X else X
+    rows, cols = len(board), len(board[0])
+    lastRow, lastCol = rows - 1, cols - 1
+
+    def promise(action):
+        i, j = action
+        if action == first:
+            return 5
+        if completesLine(board, action, me):
+            return 4
+        if completesLine(board, action, opponent):
+            return 3
+        if i == lastRow / 2 and j == lastCol / 2:
+            return 2
+        if i in (0, lastRow) and j in (0, lastCol):
+            return 1
+        return 0
+
+    candidates = actions(board)
+    if depth is not None and rows * cols > FULL_SEARCH_CELLS:
+        candidates = nearbyActions(board, candidates)
+    return sorted(candidates, key=promise, reverse=True)
+
+def nearbyActions(board, candidates):
+    """
+    Returns the candidate actions next to a mark, or the middle cell if
+    the board is empty.
+    """
+    rows, cols = len(board), len(board[0])
+    nearby = [(i, j) for i, j in candidates
+              if any(board[r][c] is not EMPTY
+                     for r in range(max(0, i - 1), min(rows, i + 2))
+                     for c in range(max(0, j - 1), min(cols, j + 2)))]
+    return nearby or [(rows // 2, cols // 2)]
+
+def completesLine(board, action, who):
+    """
+    Returns True if `who` would win by playing `action`.
+    """
+    k = winLength(board)
+    rows, cols = len(board), len(board[0])
+    for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            i, j = action[0] + sign * di, action[1] + sign * dj
+            while 0 <= i < rows and 0 <= j < cols and board[i][j] is who:
+                count += 1
+                i, j = i + sign * di, j + sign * dj
+        if count >= k:
+            return True
+    return False
+
+
+def symmetries(rows, cols):
+    """
+    Returns the rotations and reflections of a rows x cols board (8 if it
+    is square, otherwise the 4 that keep its shape), each as a list giving
+    the cell that every cell, in row order, moves to.
+    """
+    lastRow, lastCol = rows - 1, cols - 1
+    transforms = [
+        lambda i, j: (i, j),
+        lambda i, j: (lastRow - i, lastCol - j),
+        lambda i, j: (i, lastCol - j),
+        lambda i, j: (lastRow - i, j)
+    ]
+    if rows == cols:
+        transforms += [
+            lambda i, j: (j, lastRow - i),
+            lambda i, j: (lastCol - j, i),
+            lambda i, j: (j, i),
+            lambda i, j: (lastCol - j, lastRow - i)
+        ]
+    return [[transform(i, j) for i in range(rows) for j in range(cols)]
+            for transform in transforms]
+
+SYMMETRIES = {(3, 3): symmetries(3, 3)}
+
+def canonicalForm(board):
+    """
+    Returns (key, symmetry) for a board: a string that is the same for
+    all its rotations and reflections, and the index in SYMMETRIES of
+    the one that turns the board into the board the key describes.
+    """
+    shape = (len(board), len(board[0]))
+    if shape not in SYMMETRIES:
+        SYMMETRIES[shape] = symmetries(*shape)
+    cols = shape[1]
+    cells = [cell or "-" for row in board for cell in row]
+
+    best = None
+    for index, moves in enumerate(SYMMETRIES[shape]):
+        transformed = [None] * len(cells)
+        for cell, (i, j) in zip(cells, moves):
+            transformed[i * cols + j] = cell
+        key = "".join(transformed)
+        if best is None or key < best[0]:
+            best = (key, index)
+
+    # Boards of other shapes or win lengths can have the same cells
+    prefix = f"{shape[0]}x{shape[1]}/{winLength(board)}:"
+    return prefix + best[0], best[1]
+
+def lookupTransposition(key, symmetry, board):
+    """
+    Returns the cached {"value", "action", "bound", "depth"} of a board,
+    with the action turned back from the canonical board's coordinates, or
+    None.
+    """
+    if key not in transpositions:
+        return None
+    transpositions.move_to_end(key)
+    value, action, bound, depth = transpositions[key]
+    if action is not None:
+        moves = SYMMETRIES[(len(board), len(board[0]))][symmetry]
+        action = divmod(moves.index(action), len(board[0]))
+    return { "value": value, "action": action, "bound": bound,
+             "depth": depth }
+
+def storeTransposition(key, symmetry, board, value, action, bound=EXACT,
+                       depth=None):
+    """
+    Caches the value and best move of a board, found searching `depth`
+    moves ahead (None for to the end), under its canonical key, evicting
+    the least recently used board if the table is full.
+    """
+    if action is not None:
+        cols = len(board[0])
+        moves = SYMMETRIES[(len(board), cols)][symmetry]
+        action = moves[action[0] * cols + action[1]]
+    transpositions[key] = (value, action, bound, depth)
+    transpositions.move_to_end(key)
+    if len(transpositions) > TABLE_SIZE:
+        transpositions.popitem(last=False)
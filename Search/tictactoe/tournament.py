@@ -0,0 +1,234 @@
+"""
+Headless self-play tournament for Tic Tac Toe engines.
+
+Plays many games between two engines across a process pool, checks that
+engines that play perfectly get the result the position deserves (a draw,
+from the empty board), and reports how fast and how hard each engine
+worked: moves per second, positions searched per move and the latency of
+each move.
+
+    python tournament.py --games 2000 --x minimax --o bitboard --opening 2
+"""
+
+import argparse
+import cProfile
+import json
+import multiprocessing
+import random
+import time
+from collections import Counter
+
+import bitboard
+import mcts
+import tictactoe as ttt
+
+# Playouts the mcts engine runs for each move
+MCTS_PLAYOUTS = 200
+
+
+def randomMove(board, stats):
+    return random.choice(sorted(ttt.actions(board)))
+
+
+def bitboardMove(board, stats):
+    return bitboard.minimax(board)
+
+
+def mctsMove(board, stats):
+    stats["nodes"] = MCTS_PLAYOUTS
+    return mcts.mcts(board, timeLimit=None, playouts=MCTS_PLAYOUTS,
+                     rollout="heuristic", seed=random.randrange(2 ** 32))
+
+
+# Engines by name: functions of (board, stats) returning a move, that
+# may count the positions they search in stats["nodes"]
+ENGINES = {
+    "bitboard": bitboardMove,
+    "mcts": mctsMove,
+    "minimax": ttt.minimax,
+    "random": randomMove
+}
+
+# Engines that never make a mistake
+PERFECT = {"bitboard", "minimax"}
+
+
+def playGame(game):
+    """
+    Plays one game, given as (xEngine, oEngine, opening, seed), after
+    `opening` random moves. Returns a dict of the result, and of the time
+    and positions searched for every move each engine made.
+    """
+    xEngine, oEngine, opening, seed = game
+    random.seed(seed)
+
+    board = ttt.initial_state()
+    for _ in range(opening):
+        if ttt.terminal(board):
+            break
+        board = ttt.result(board, random.choice(sorted(ttt.actions(board))))
+    expected = bitboard.value(bitboard.fromBoard(board))
+
+    moves = {xEngine: [], oEngine: []}
+    while not ttt.terminal(board):
+        engine = xEngine if ttt.player(board) == ttt.X else oEngine
+        stats = {}
+        started = time.perf_counter()
+        action = ENGINES[engine](board, stats)
+        elapsed = time.perf_counter() - started
+        moves[engine].append((elapsed, stats.get("nodes")))
+        board = ttt.result(board, action)
+
+    return {
+        "value": ttt.utility(board),
+        "expected": expected,
+        "moves": moves
+    }
+
+
+def useBook(enabled):
+    """
+    Lets minimax answer from the opening book or not, in this process.
+    Runs as the initializer of every worker, so that it holds however
+    the workers are started.
+    """
+    ttt.book = None if enabled else {}
+
+
+def percentile(values, fraction):
+    """
+    Returns the given percentile of a sorted list, or None if it is empty.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def tournament(xEngine, oEngine, games=1000, opening=0, processes=None,
+               seed=0, book=True):
+    """
+    Plays `games` games and returns a dict summarising them. With `book`
+    False, minimax searches every move instead of using the opening book.
+    """
+    started = time.perf_counter()
+    results = Counter()
+    mistakes = 0
+    times = {xEngine: [], oEngine: []}
+    nodes = {xEngine: [], oEngine: []}
+
+    jobs = [(xEngine, oEngine, opening, seed + i) for i in range(games)]
+    # Games played here use the book setting only while they last
+    savedBook = ttt.book
+    if processes == 1:
+        useBook(book)
+        pool = None
+        played = map(playGame, jobs)
+    else:
+        pool = multiprocessing.Pool(processes, useBook, (book,))
+        played = pool.imap_unordered(playGame, jobs, chunksize=16)
+    try:
+        for game in played:
+            results[{1: "X", -1: "O", 0: "draw"}[game["value"]]] += 1
+            # With perfect play on both sides, the game ends as the
+            # position after the opening says it should
+            if (xEngine in PERFECT and oEngine in PERFECT
+                    and game["value"] != game["expected"]):
+                mistakes += 1
+            for engine, moves in game["moves"].items():
+                for elapsed, searched in moves:
+                    times[engine].append(elapsed)
+                    if searched is not None:
+                        nodes[engine].append(searched)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        else:
+            ttt.book = savedBook
+
+    summary = {
+        "games": games,
+        "seconds": round(time.perf_counter() - started, 3),
+        "x_wins": results["X"],
+        "o_wins": results["O"],
+        "draws": results["draw"],
+        "mistakes": mistakes if xEngine in PERFECT and oEngine in PERFECT
+                    else None,
+        "engines": {}
+    }
+    for engine in times:
+        latencies = sorted(times[engine])
+        total = sum(latencies)
+        summary["engines"][engine] = {
+            "moves": len(latencies),
+            "moves_per_second": round(len(latencies) / total, 1)
+                                if total else None,
+            "mean_nodes_per_move": (round(sum(nodes[engine])
+                                          / len(nodes[engine]), 1)
+                                    if nodes[engine] else None),
+            "p50_ms": latency(latencies, 0.5),
+            "p90_ms": latency(latencies, 0.9),
+            "p99_ms": latency(latencies, 0.99),
+            "max_ms": latency(latencies, 1.0)
+        }
+    return summary
+
+
+def latency(latencies, fraction):
+    value = percentile(latencies, fraction)
+    return None if value is None else round(value * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tic Tac Toe tournament")
+    parser.add_argument("--x", choices=sorted(ENGINES), default="minimax",
+                        help="engine playing X")
+    parser.add_argument("--o", choices=sorted(ENGINES), default="minimax",
+                        help="engine playing O")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--opening", type=int, default=0,
+                        help="random moves to start each game with, so that "
+                             "games differ")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-book", action="store_true",
+                        help="search every move instead of using the "
+                             "opening book")
+    parser.add_argument("--json", action="store_true",
+                        help="print the summary as JSON")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="play every game in this process under cProfile "
+                             "and save the profile to PATH")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        summary = tournament(args.x, args.o, args.games, args.opening, 1,
+                             args.seed, not args.no_book)
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    else:
+        summary = tournament(args.x, args.o, args.games, args.opening,
+                             args.processes, args.seed, not args.no_book)
+    if args.json:
+        print(json.dumps(summary))
+        return
+
+    print(f"{summary['games']} games in {summary['seconds']}s: "
+          f"X won {summary['x_wins']}, O won {summary['o_wins']}, "
+          f"{summary['draws']} drawn")
+    if summary["mistakes"] is not None:
+        print(f"Games not ending as perfect play should: "
+              f"{summary['mistakes']}")
+    for engine, timings in summary["engines"].items():
+        print(f"  {engine:>8}: {timings['moves']} moves, "
+              f"{timings['moves_per_second']} moves/s, "
+              f"{timings['mean_nodes_per_move']} nodes/move, "
+              f"p50 {timings['p50_ms']} ms, p90 {timings['p90_ms']} ms, "
+              f"p99 {timings['p99_ms']} ms, max {timings['max_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()